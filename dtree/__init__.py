@@ -8,8 +8,25 @@ __author__ = "Alejandro Daniel Attento"
 # Import main classes for easy access
 from .core import DecisionTree
 from .models import Node, Edge, NodeType, TreeStructure
-from .calculators import ExpectedValueCalculator, PathFinder
-from .formatters import PrecisionFormatter, TreePrinter, MermaidGenerator
+from .calculators import ExpectedValueCalculator, PathFinder, ValueOfInformationCalculator
+from .reducers import TreeReducer, ReducedTree
+
+# Formatters and columnar export (numpy) are only imported when first accessed
+_LAZY_IMPORTS = {
+    "PrecisionFormatter": ".formatters",
+    "TreePrinter": ".formatters",
+    "MermaidGenerator": ".formatters",
+    "ColumnarExporter": ".columnar",
+    "ColumnarImporter": ".columnar",
+}
+
+def __getattr__(name):
+    if name in _LAZY_IMPORTS:
+        import importlib
+        value = getattr(importlib.import_module(_LAZY_IMPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Define what gets imported with "from dtree import *"
 __all__ = [
@@ -20,7 +37,12 @@ __all__ = [
     "TreeStructure",
     "ExpectedValueCalculator",
     "PathFinder",
+    "ValueOfInformationCalculator",
     "PrecisionFormatter",
     "TreePrinter",
-    "MermaidGenerator"
+    "MermaidGenerator",
+    "TreeReducer",
+    "ReducedTree",
+    "ColumnarExporter",
+    "ColumnarImporter"
 ]
\ No newline at end of file
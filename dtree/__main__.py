@@ -0,0 +1,7 @@
+"""
+Allows running the command-line interface with "python -m dtree"
+"""
+import sys
+from .cli import main
+
+sys.exit(main())
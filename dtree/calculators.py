@@ -1,7 +1,9 @@
 """
 Calculation logic for decision trees
 """
-from typing import Dict, Callable, Optional
+import math
+from itertools import product
+from typing import Dict, Callable, Optional, Iterable, List, Tuple, Union, Set, Mapping
 from .models import TreeStructure, NodeType
 
 class ExpectedValueCalculator:
@@ -10,83 +12,118 @@ class ExpectedValueCalculator:
     def __init__(self, tree_structure: TreeStructure):
         self.tree_structure = tree_structure
     
-    def calculate_expected_utilities(self, utility_function: Callable[[float], float]) -> Dict[str, float]:
+    def calculate_expected_utilities(self, utility_function: Callable[[float], float],
+                                     root: Optional[str] = None) -> Dict[str, float]:
         """
         Calculate expected utility for all nodes using backward induction (utility function applied at leaves only)
+        If root is given, only the root and its descendants are evaluated.
         Returns a dict mapping node_id to expected utility.
         """
-        # Reset all expected values
-        for node in self.tree_structure.nodes.values():
-            node.expected_value = None
-        for node_id in self.tree_structure.nodes.keys():
-            self._calculate_node_utility(node_id, utility_function)
-        return {node_id: node.expected_value for node_id, node in self.tree_structure.nodes.items()}
+        return self._calculate(utility_function, root)
 
-    def calculate_expected_values(self) -> Dict[str, float]:
+    def calculate_expected_values(self, root: Optional[str] = None) -> Dict[str, float]:
         """
         Calculate expected monetary value for all nodes using backward induction (no utility function)
+        If root is given, only the root and its descendants are evaluated.
         Returns a dict mapping node_id to expected value.
         """
-        for node in self.tree_structure.nodes.values():
-            node.expected_value = None
-        for node_id in self.tree_structure.nodes.keys():
-            self._calculate_node_value(node_id)
-        return {node_id: node.expected_value for node_id, node in self.tree_structure.nodes.items()}
+        return self._calculate(None, root)
 
-    def calculate_both(self, utility_function: Callable[[float], float]) -> Dict[str, dict]:
+    def calculate_both(self, utility_function: Callable[[float], float],
+                       root: Optional[str] = None) -> Dict[str, dict]:
         """
         Calculate both expected value and expected utility for all nodes.
+        If root is given, only the root and its descendants are evaluated.
         Returns a dict mapping node_id to {'expected_value': ..., 'utility_value': ...}
         """
-        ev = self.calculate_expected_values()
-        eu = self.calculate_expected_utilities(utility_function)
+        ev = self.calculate_expected_values(root)
+        eu = self.calculate_expected_utilities(utility_function, root)
         return {k: {'expected_value': ev[k], 'utility_value': eu[k]} for k in ev}
 
-    def _calculate_node_utility(self, node_id: str, utility_function: Callable[[float], float]) -> float:
-        node = self.tree_structure.nodes[node_id]
-        if node.expected_value is not None:
-            return node.expected_value
-        if node.node_type == NodeType.TERMINAL:
-            node.expected_value = utility_function(node.value)
-        elif node.node_type == NodeType.CHANCE:
-            children = self.tree_structure.get_children(node_id)
-            node.expected_value = sum(
-                prob * self._calculate_node_utility(child_id, utility_function)
-                for child_id, prob in children
-            )
-        elif node.node_type == NodeType.DECISION:
-            children = self.tree_structure.get_children(node_id)
-            if not children:
-                node.expected_value = 0.0
-            else:
-                node.expected_value = max(
-                    self._calculate_node_utility(child_id, utility_function)
-                    for child_id, _ in children
-                )
-        return node.expected_value
+    def evaluate_changed(self, changed: Set[str], known: Mapping[str, float],
+                         utility_function: Optional[Callable[[float], float]] = None,
+                         overrides: Optional[Dict[str, List[Tuple[str, float]]]] = None) -> Dict[str, float]:
+        """
+        Re-evaluate only the changed nodes, taking the values of all other nodes from known
+
+        Args:
+            changed: Node IDs to evaluate, every ancestor of a changed node must be included
+            known: Values of the nodes that did not change
+            utility_function: Optional utility function applied at the leaves
+            overrides: Optional dict mapping node_id to the (child_id, probability) list to use instead of its edges
+
+        Returns:
+            Dict mapping each changed node_id to its new value
+        """
+        values = {}
+        for node_id in changed:
+            for child_id, _ in self.tree_structure.get_children(node_id):
+                if child_id not in changed:
+                    values[child_id] = known[child_id]
+        for node_id in changed:
+            self._evaluate_node(node_id, values, utility_function, overrides)
+        return {node_id: values[node_id] for node_id in changed}
+
+    def _calculate(self, utility_function: Optional[Callable[[float], float]], root: Optional[str]) -> Dict[str, float]:
+        if root is None and self.tree_structure.has_snapshots():
+            return self._calculate_cached(utility_function)
+        node_ids = self._get_node_ids(root)
+        values = {}
+        for node_id in node_ids:
+            self._evaluate_node(node_id, values, utility_function)
+        if not self.tree_structure.has_snapshots():
+            # Nodes shared between snapshots keep no per-tree results
+            for node_id in node_ids:
+                self.tree_structure.nodes[node_id].expected_value = values[node_id]
+        return {node_id: values[node_id] for node_id in node_ids}
 
-    def _calculate_node_value(self, node_id: str) -> float:
+    def _calculate_cached(self, utility_function: Optional[Callable[[float], float]]) -> Dict[str, float]:
+        """Evaluate all nodes, re-evaluating only the nodes changed since the last cached evaluation"""
+        cached, changed = self.tree_structure.get_cached_values(utility_function)
+        if cached is None:
+            values = {}
+            for node_id in self.tree_structure.nodes:
+                self._evaluate_node(node_id, values, utility_function)
+            values = {node_id: values[node_id] for node_id in self.tree_structure.nodes}
+        else:
+            values = dict(cached)
+            if changed:
+                values.update(self.evaluate_changed(changed, cached, utility_function))
+        self.tree_structure.cache_values(values, utility_function)
+        return dict(values)
+
+    def _get_node_ids(self, root: Optional[str]) -> List[str]:
+        if root is None:
+            return list(self.tree_structure.nodes)
+        return self.tree_structure.get_descendants(root)
+
+    def _evaluate_node(self, node_id: str, values: Dict[str, float],
+                       utility_function: Optional[Callable[[float], float]] = None,
+                       overrides: Optional[Dict[str, List[Tuple[str, float]]]] = None) -> float:
+        """Backward induction for a node, values holds the nodes evaluated so far"""
+        if node_id in values:
+            return values[node_id]
         node = self.tree_structure.nodes[node_id]
-        if node.expected_value is not None:
-            return node.expected_value
         if node.node_type == NodeType.TERMINAL:
-            node.expected_value = node.value
-        elif node.node_type == NodeType.CHANCE:
-            children = self.tree_structure.get_children(node_id)
-            node.expected_value = sum(
-                prob * self._calculate_node_value(child_id)
-                for child_id, prob in children
-            )
-        elif node.node_type == NodeType.DECISION:
-            children = self.tree_structure.get_children(node_id)
-            if not children:
-                node.expected_value = 0.0
+            value = utility_function(node.value) if utility_function is not None else node.value
+        else:
+            children = overrides.get(node_id) if overrides else None
+            if children is None:
+                children = self.tree_structure.get_children(node_id)
+            if node.node_type == NodeType.CHANCE:
+                value = sum(
+                    prob * self._evaluate_node(child_id, values, utility_function, overrides)
+                    for child_id, prob in children
+                )
+            elif not children:
+                value = 0.0
             else:
-                node.expected_value = max(
-                    self._calculate_node_value(child_id)
+                value = max(
+                    self._evaluate_node(child_id, values, utility_function, overrides)
                     for child_id, _ in children
                 )
-        return node.expected_value
+        values[node_id] = value
+        return value
 
 class PathFinder:
     """Handles optimal path finding in decision trees"""
@@ -109,9 +146,9 @@ class PathFinder:
             List of node IDs representing the optimal path
         """
         if utility_function is not None:
-            decision_values = self.calculator.calculate_expected_utilities(utility_function)
+            decision_values = self.calculator.calculate_expected_utilities(utility_function, start_node)
         else:
-            decision_values = self.calculator.calculate_expected_values()
+            decision_values = self.calculator.calculate_expected_values(start_node)
         path = [start_node]
         current = start_node
         while True:
@@ -136,4 +173,157 @@ class PathFinder:
                 path.append(current)
             else:
                 break
-        return path 
\ No newline at end of file
+        return path 
+
+class ValueOfInformationCalculator:
+    """Handles value of information (EVPI / EVSI) calculations for decision trees"""
+
+    def __init__(self, tree_structure: TreeStructure):
+        self.tree_structure = tree_structure
+        self.calculator = ExpectedValueCalculator(tree_structure)
+
+    def calculate_evpi(self, node_ids: Union[str, Iterable[str]],
+                       utility_function: Optional[Callable[[float], float]] = None) -> float:
+        """
+        Calculate the expected value of perfect information for one or more chance nodes.
+
+        The outcome of every given chance node is assumed to be known before any decision is
+        made. Only the ancestors of the given nodes are re-evaluated for each outcome, the
+        rest of the tree reuses the values of the base evaluation.
+
+        Args:
+            node_ids: A chance node ID or an iterable of chance node IDs
+            utility_function: Optional utility function, if given the result is in utility units
+
+        Returns:
+            Expected value (or utility) of perfect information
+        """
+        if isinstance(node_ids, str):
+            node_ids = [node_ids]
+        node_ids = list(dict.fromkeys(node_ids))
+        for node_id in node_ids:
+            self._validate_chance_node(node_id)
+        # A chance node without children has no outcome to learn about
+        node_ids = [node_id for node_id in node_ids if self.tree_structure.get_children(node_id)]
+        base_values = self._evaluate(utility_function)
+        roots = self.tree_structure.get_roots()
+        affected = self._get_affected_nodes(node_ids)
+
+        value_with_information = 0.0
+        for outcomes in product(*(self.tree_structure.get_children(node_id) for node_id in node_ids)):
+            probability = 1.0
+            overrides = {}
+            for node_id, (child_id, prob) in zip(node_ids, outcomes):
+                probability *= prob
+                overrides[node_id] = [(child_id, 1.0)]
+            if probability == 0.0:
+                continue
+            value_with_information += probability * self._evaluate_roots(
+                roots, base_values, affected, overrides, utility_function
+            )
+        return value_with_information - sum(base_values[root] for root in roots)
+
+    def calculate_evsi(self, node_id: str, signal: Dict[str, Dict[str, float]],
+                       utility_function: Optional[Callable[[float], float]] = None) -> float:
+        """
+        Calculate the expected value of sample (imperfect) information for a chance node.
+
+        Args:
+            node_id: Chance node ID the signal gives information about
+            signal: Dict mapping each signal outcome to a dict of {child_id: P(signal | child)}
+            utility_function: Optional utility function, if given the result is in utility units
+
+        Returns:
+            Expected value (or utility) of sample information
+        """
+        self._validate_chance_node(node_id)
+        children = self.tree_structure.get_children(node_id)
+        child_ids = {child_id for child_id, _ in children}
+        for signal_id, likelihoods in signal.items():
+            unknown = set(likelihoods) - child_ids
+            if unknown:
+                raise ValueError(f"Signal '{signal_id}' refers to nodes that are not children of '{node_id}': {sorted(unknown)}")
+            negative = sorted(child_id for child_id, likelihood in likelihoods.items() if likelihood < 0.0)
+            if negative:
+                raise ValueError(f"Signal '{signal_id}' has negative likelihoods for {negative}")
+        for child_id in child_ids:
+            total = sum(likelihoods.get(child_id, 0.0) for likelihoods in signal.values())
+            if not math.isclose(total, 1.0, abs_tol=1e-9):
+                raise ValueError(f"Signal likelihoods for '{child_id}' must sum to 1.0, got {total}")
+        if not children:
+            # A chance node without children has no outcome to learn about
+            return 0.0
+
+        base_values = self._evaluate(utility_function)
+        roots = self.tree_structure.get_roots()
+        affected = self._get_affected_nodes([node_id])
+
+        value_with_information = 0.0
+        for likelihoods in signal.values():
+            joint = [(child_id, prob * likelihoods.get(child_id, 0.0)) for child_id, prob in children]
+            signal_probability = sum(prob for _, prob in joint)
+            if signal_probability == 0.0:
+                continue
+            overrides = {node_id: [(child_id, prob / signal_probability) for child_id, prob in joint]}
+            value_with_information += signal_probability * self._evaluate_roots(
+                roots, base_values, affected, overrides, utility_function
+            )
+        return value_with_information - sum(base_values[root] for root in roots)
+
+    def rank_evpi(self, utility_function: Optional[Callable[[float], float]] = None) -> List[Tuple[str, float]]:
+        """
+        Calculate the EVPI of every chance node, sharing a single base evaluation.
+
+        Returns:
+            List of (node_id, evpi) tuples sorted by decreasing EVPI
+        """
+        base_values = self._evaluate(utility_function)
+        roots = self.tree_structure.get_roots()
+        base_value = sum(base_values[root] for root in roots)
+
+        ranking = []
+        for node_id, node in self.tree_structure.nodes.items():
+            children = self.tree_structure.get_children(node_id)
+            if node.node_type != NodeType.CHANCE or not children:
+                continue
+            affected = self._get_affected_nodes([node_id])
+            value_with_information = sum(
+                prob * self._evaluate_roots(roots, base_values, affected,
+                                            {node_id: [(child_id, 1.0)]}, utility_function)
+                for child_id, prob in children
+                if prob > 0.0
+            )
+            ranking.append((node_id, value_with_information - base_value))
+        ranking.sort(key=lambda item: item[1], reverse=True)
+        return ranking
+
+    def _validate_chance_node(self, node_id: str) -> None:
+        if node_id not in self.tree_structure.nodes:
+            raise ValueError(f"Node '{node_id}' does not exist")
+        if self.tree_structure.nodes[node_id].node_type != NodeType.CHANCE:
+            raise ValueError(f"Node '{node_id}' is not a chance node")
+
+    def _get_affected_nodes(self, node_ids: List[str]) -> Set[str]:
+        """Get the given nodes together with all of their ancestors"""
+        affected = set()
+        stack = list(node_ids)
+        while stack:
+            node_id = stack.pop()
+            if node_id in affected:
+                continue
+            affected.add(node_id)
+            stack.extend(parent_id for parent_id, _ in self.tree_structure.get_parents(node_id))
+        return affected
+
+    def _evaluate(self, utility_function: Optional[Callable[[float], float]]) -> Dict[str, float]:
+        """Evaluate every node of the unmodified tree"""
+        if utility_function is not None:
+            return self.calculator.calculate_expected_utilities(utility_function)
+        return self.calculator.calculate_expected_values()
+
+    def _evaluate_roots(self, roots: List[str], base_values: Dict[str, float], affected: Set[str],
+                        overrides: Dict[str, List[Tuple[str, float]]],
+                        utility_function: Optional[Callable[[float], float]]) -> float:
+        """Evaluate the roots, recomputing only affected nodes and reusing base values elsewhere"""
+        values = self.calculator.evaluate_changed(affected, base_values, utility_function, overrides)
+        return sum(values.get(root, base_values[root]) for root in roots)
@@ -0,0 +1,105 @@
+"""
+Command-line entry point - evaluates decision trees stored as JSON files
+"""
+import argparse
+import json
+import sys
+from typing import List, Optional, TextIO
+from .core import DecisionTree
+from .models import NodeType
+
+OUTPUTS = ["values", "path", "summary", "jsonl", "mermaid"]
+
+def load_tree(stream: TextIO, display_precision: Optional[int] = None) -> DecisionTree:
+    """
+    Load a decision tree from a JSON text stream
+
+    The JSON object has a "nodes" list of {"node_id", "name", "node_type", "value"} objects
+    (name defaults to node_id, value is only used for terminal nodes) and an "edges" list of
+    {"from_node", "to_node", "probability"} objects (probability defaults to 1.0).
+    """
+    data = json.load(stream)
+    if not isinstance(data, dict):
+        raise ValueError("expected a JSON object with 'nodes' and 'edges'")
+    dt = DecisionTree(display_precision)
+    for node in _get_objects(data, "nodes"):
+        node_id = node["node_id"]
+        name = node.get("name", node_id)
+        node_type = NodeType(node["node_type"])
+        if node_type == NodeType.DECISION:
+            dt.add_decision_node(node_id, name)
+        elif node_type == NodeType.CHANCE:
+            dt.add_chance_node(node_id, name)
+        else:
+            value = node.get("value")
+            dt.add_terminal_node(node_id, name, None if value is None else float(value))
+    for edge in _get_objects(data, "edges"):
+        dt.add_edge(edge["from_node"], edge["to_node"], float(edge.get("probability", 1.0)))
+    return dt
+
+def _get_objects(data: dict, key: str) -> list:
+    """Get a list of JSON objects, checking its type"""
+    items = data.get(key, [])
+    if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+        raise ValueError(f"'{key}' must be a list of JSON objects")
+    return items
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="dtree",
+        description="Evaluate decision trees stored as JSON files.",
+    )
+    parser.add_argument("files", nargs="*", default=["-"],
+                        help="JSON tree files to evaluate, '-' reads from stdin (default)")
+    parser.add_argument("-o", "--output", choices=OUTPUTS, default="values",
+                        help="what to output for each tree (default: values)")
+    parser.add_argument("--root", help="node ID to start from, by default the roots of the tree are used")
+    parser.add_argument("--precision", type=int, help="fixed display precision for summaries and diagrams")
+    parser.add_argument("--max-depth", type=int, help="maximum depth shown in summaries")
+    parser.add_argument("--max-nodes", type=int, help="maximum number of nodes shown in summaries")
+    parser.add_argument("--optimal-path-only", action="store_true",
+                        help="show only the nodes on the optimal path in summaries")
+    return parser
+
+def evaluate_tree(dt: DecisionTree, source: str, args: argparse.Namespace, stream: TextIO) -> None:
+    """Write the requested output for a single tree"""
+    if args.output == "values":
+        values = dt.calculate_raw_expected_values(args.root)
+        stream.write(json.dumps({"source": source, "expected_values": values}) + "\n")
+    elif args.output == "path":
+        roots = [args.root] if args.root is not None else dt.get_roots()
+        paths = {root: dt.get_optimal_path(root) for root in roots}
+        stream.write(json.dumps({"source": source, "optimal_paths": paths}) + "\n")
+    elif args.output == "mermaid":
+        stream.write(dt.generate_mermaid_diagram(root=args.root) + "\n")
+    else:
+        dt.write_tree_summary(stream, args.root, args.max_depth, args.max_nodes,
+                              args.optimal_path_only, json_lines=args.output == "jsonl")
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the command-line interface, returns the exit code"""
+    args = build_parser().parse_args(argv)
+    stream = sys.stdout
+    show_headers = len(args.files) > 1 and args.output in ("summary", "mermaid")
+    exit_code = 0
+
+    for filename in args.files:
+        source = "<stdin>" if filename == "-" else filename
+        try:
+            if filename == "-":
+                dt = load_tree(sys.stdin, args.precision)
+            else:
+                with open(filename, encoding="utf-8") as f:
+                    dt = load_tree(f, args.precision)
+            if show_headers:
+                stream.write(f"==> {source} <==\n")
+            evaluate_tree(dt, source, args, stream)
+        except KeyError as e:
+            # Keep going in batch mode, report the failing file on stderr
+            sys.stderr.write(f"dtree: {source}: missing field {e}\n")
+            exit_code = 1
+        except (OSError, ValueError, TypeError, AttributeError) as e:
+            sys.stderr.write(f"dtree: {source}: {e}\n")
+            exit_code = 1
+    stream.flush()
+    return exit_code
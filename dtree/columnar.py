@@ -0,0 +1,190 @@
+"""
+Columnar export and import of decision trees
+"""
+import csv
+import math
+from typing import Dict, List, Optional, Any, TextIO, Tuple
+import numpy as np
+from .models import Node, Edge, NodeType, TreeStructure
+
+# Optional pyarrow import for Arrow export
+try:
+    import pyarrow  # type: ignore
+except ImportError:  # pragma: no cover
+    pyarrow = None  # Fallback when pyarrow is not installed
+
+NODE_COLUMNS = ["node_id", "name", "node_type", "value", "expected_value", "utility_value",
+                "depth", "parent", "on_optimal_path"]
+EDGE_COLUMNS = ["from_node", "to_node", "probability"]
+
+class ColumnarExporter:
+    """Handles export of the tree structure and results as columns (numpy arrays)"""
+
+    def __init__(self, tree_structure: TreeStructure):
+        self.tree_structure = tree_structure
+
+    def export_nodes(self, expected_values: Optional[Dict] = None,
+                     optimal_path_nodes: Optional[List[str]] = None) -> Dict[str, np.ndarray]:
+        """
+        Export the nodes as a dict of column name to numpy array
+
+        Args:
+            expected_values: Optional dict mapping node_id to {'expected_value': ..., 'utility_value': ...}
+            optimal_path_nodes: Optional list of node IDs on the optimal path
+
+        Returns:
+            Dict with the columns in NODE_COLUMNS. Missing numbers are NaN, depth is -1 for
+            unreachable nodes and parent is an empty string for roots.
+        """
+        nodes = self.tree_structure.nodes
+        depths = self._calculate_depths()
+        on_path = set(optimal_path_nodes or [])
+        size = len(nodes)
+
+        columns = {
+            "node_id": np.array(list(nodes), dtype=str),
+            "name": np.array([node.name for node in nodes.values()], dtype=str),
+            "node_type": np.array([node.node_type.value for node in nodes.values()], dtype=str),
+            "value": np.fromiter((np.nan if node.value is None else node.value for node in nodes.values()),
+                                 dtype=float, count=size),
+            "expected_value": np.full(size, np.nan),
+            "utility_value": np.full(size, np.nan),
+            "depth": np.fromiter((depths.get(node_id, -1) for node_id in nodes), dtype=int, count=size),
+            "parent": np.array([self._get_first_parent(node_id) for node_id in nodes], dtype=str),
+            "on_optimal_path": np.fromiter((node_id in on_path for node_id in nodes), dtype=bool, count=size),
+        }
+        if expected_values is not None:
+            for index, node_id in enumerate(nodes):
+                if node_id in expected_values:
+                    columns["expected_value"][index] = expected_values[node_id]['expected_value']
+                    columns["utility_value"][index] = expected_values[node_id]['utility_value']
+        return columns
+
+    def export_node_records(self, expected_values: Optional[Dict] = None,
+                            optimal_path_nodes: Optional[List[str]] = None) -> np.recarray:
+        """Export the nodes as a numpy record array with the columns in NODE_COLUMNS"""
+        columns = self.export_nodes(expected_values, optimal_path_nodes)
+        return np.rec.fromarrays([columns[name] for name in NODE_COLUMNS], names=NODE_COLUMNS)
+
+    def export_edges(self) -> Dict[str, np.ndarray]:
+        """Export the edges as a dict of column name to numpy array with the columns in EDGE_COLUMNS"""
+        edges = self.tree_structure.edges
+        return {
+            "from_node": np.array([edge.from_node for edge in edges], dtype=str),
+            "to_node": np.array([edge.to_node for edge in edges], dtype=str),
+            "probability": np.fromiter((edge.probability for edge in edges), dtype=float, count=len(edges)),
+        }
+
+    def to_arrow(self, expected_values: Optional[Dict] = None,
+                 optimal_path_nodes: Optional[List[str]] = None) -> Tuple[Any, Any]:
+        """
+        Export the nodes and edges as Arrow tables
+
+        Returns:
+            Tuple of (nodes_table, edges_table) as pyarrow.Table
+        """
+        if pyarrow is None:
+            raise ImportError(
+                "The 'pyarrow' Python package is required for Arrow export."
+                " Install it via 'pip install pyarrow' or use 'export_nodes' / 'export_edges'"
+                " to get numpy arrays instead."
+            )
+        nodes = self.export_nodes(expected_values, optimal_path_nodes)
+        return pyarrow.table(nodes), pyarrow.table(self.export_edges())
+
+    @staticmethod
+    def write_csv(columns: Dict[str, Any], stream: TextIO) -> None:
+        """Write a dict of columns as CSV to a text stream"""
+        writer = csv.writer(stream)
+        writer.writerow(list(columns))
+        writer.writerows(zip(*(_to_list(column) for column in columns.values())))
+
+    def _calculate_depths(self) -> Dict[str, int]:
+        """Get the minimum depth of every node reachable from a root"""
+        depths = {root: 0 for root in self.tree_structure.get_roots()}
+        queue = list(depths)
+        for node_id in queue:
+            for child_id, _ in self.tree_structure.get_children(node_id):
+                if child_id not in depths:
+                    depths[child_id] = depths[node_id] + 1
+                    queue.append(child_id)
+        return depths
+
+    def _get_first_parent(self, node_id: str) -> str:
+        parents = self.tree_structure.get_parents(node_id)
+        return parents[0][0] if parents else ""
+
+class ColumnarImporter:
+    """Handles building a tree structure from columns in bulk"""
+
+    @staticmethod
+    def read_csv(stream: TextIO) -> Dict[str, List[str]]:
+        """Read a CSV text stream into a dict of columns"""
+        reader = csv.reader(stream)
+        header = next(reader)
+        columns = {name: [] for name in header}
+        for row in reader:
+            for name, cell in zip(header, row):
+                columns[name].append(cell)
+        return columns
+
+    def build_tree_structure(self, nodes: Any, edges: Any) -> TreeStructure:
+        """
+        Build a tree structure from node and edge columns
+
+        Args:
+            nodes: Dict of columns (or a numpy record array) with at least node_id and node_type,
+                optionally name and value. Extra columns, such as exported results, are ignored.
+            edges: Dict of columns (or a numpy record array) with from_node, to_node and optionally probability
+
+        Returns:
+            TreeStructure with all nodes and edges
+        """
+        node_ids = [str(node_id) for node_id in _to_list(_get_column(nodes, "node_id"))]
+        node_types = _to_list(_get_column(nodes, "node_type"))
+        names = _to_list(_get_column(nodes, "name", node_ids))
+        values = _to_list(_get_column(nodes, "value", [None] * len(node_ids)))
+
+        tree_nodes = {}
+        for node_id, name, node_type, value in zip(node_ids, names, node_types, values):
+            if node_id in tree_nodes:
+                raise ValueError(f"Node with ID '{node_id}' already exists")
+            tree_nodes[node_id] = Node(node_id, str(name), NodeType(node_type), _to_optional_float(value))
+
+        from_nodes = _to_list(_get_column(edges, "from_node"))
+        to_nodes = _to_list(_get_column(edges, "to_node"))
+        probabilities = _to_list(_get_column(edges, "probability", [1.0] * len(from_nodes)))
+
+        tree_edges = []
+        for from_node, to_node, probability in zip(from_nodes, to_nodes, probabilities):
+            from_node, to_node = str(from_node), str(to_node)
+            if from_node not in tree_nodes:
+                raise ValueError(f"From node '{from_node}' does not exist")
+            if to_node not in tree_nodes:
+                raise ValueError(f"To node '{to_node}' does not exist")
+            tree_edges.append(Edge(from_node, to_node, float(probability)))
+
+        return TreeStructure(tree_nodes, tree_edges)
+
+def _get_column(columns: Any, name: str, default: Optional[List] = None) -> Any:
+    """Get a column from a dict of columns or a numpy record array"""
+    names = columns.dtype.names if hasattr(columns, "dtype") else columns
+    if name in names:
+        return columns[name]
+    if default is None:
+        raise ValueError(f"Missing required column '{name}'")
+    return default
+
+def _to_list(column: Any) -> List:
+    if hasattr(column, "tolist"):
+        return column.tolist()
+    if hasattr(column, "to_pylist"):
+        return column.to_pylist()
+    return list(column)
+
+def _to_optional_float(value: Any) -> Optional[float]:
+    """Convert a cell to a float, mapping None, empty strings and NaN to None"""
+    if value is None or value == "":
+        return None
+    value = float(value)
+    return None if math.isnan(value) else value
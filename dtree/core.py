@@ -1,16 +1,27 @@
 """
 Main DecisionTree class - orchestrates the different components
 """
-from typing import Dict, List, Tuple, Callable, Optional
+from typing import Dict, List, Tuple, Callable, Optional, Iterable, Union, TextIO, Any, TYPE_CHECKING
 from .models import Node, Edge, NodeType, TreeStructure
-from .calculators import ExpectedValueCalculator, PathFinder
-from .formatters import PrecisionFormatter, TreePrinter, MermaidGenerator
+from .calculators import ExpectedValueCalculator, PathFinder, ValueOfInformationCalculator
+from .reducers import TreeReducer, ReducedTree
 
-# Optional mermaid import for diagram generation
-try:
-    from mermaid import Mermaid  # type: ignore
-except ImportError:  # pragma: no cover
-    Mermaid = None  # Fallback when mermaid is not installed
+# Formatters, columnar export (numpy) and mermaid are imported on first use to keep startup fast
+if TYPE_CHECKING:  # pragma: no cover
+    import numpy as np
+    from .formatters import PrecisionFormatter, TreePrinter, MermaidGenerator
+    from .columnar import ColumnarExporter
+
+def __getattr__(name: str) -> Any:
+    # Optional mermaid import for diagram generation, deferred until first use
+    if name == "Mermaid":
+        try:
+            from mermaid import Mermaid  # type: ignore
+        except ImportError:  # pragma: no cover
+            Mermaid = None  # Fallback when mermaid is not installed
+        globals()["Mermaid"] = Mermaid
+        return Mermaid
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 class DecisionTree:
     """
@@ -20,29 +31,84 @@ class DecisionTree:
     - TreeStructure: Manages the tree structure
     - ExpectedValueCalculator: Handles calculations
     - PathFinder: Finds optimal paths
+    - ValueOfInformationCalculator: Handles EVPI / EVSI calculations
+    - ColumnarExporter: Exports the tree and results as columns
     - Formatters: Handle display and formatting
     """
     
     def __init__(self, display_precision: Optional[int] = None, 
-                 utility_function: Optional[Callable[[float], float]] = None):
+                 utility_function: Optional[Callable[[float], float]] = None,
+                 tree_structure: Optional[TreeStructure] = None):
         """
         Initialize a Decision Tree
         
         Args:
             display_precision: Fixed precision for display purposes. If None, will use automatic precision based on significant digits.
             utility_function: Optional function to transform expected values. Should take a float and return a float.
+            tree_structure: Optional existing tree structure to analyze. If None, an empty one is created.
         """
         # Initialize components
-        self.tree_structure = TreeStructure()
-        self.formatter = PrecisionFormatter(display_precision)
+        self.tree_structure = tree_structure if tree_structure is not None else TreeStructure()
         self.calculator = ExpectedValueCalculator(self.tree_structure)
         self.path_finder = PathFinder(self.tree_structure, self.calculator)
-        self.printer = TreePrinter(self.tree_structure, self.formatter)
-        self.mermaid_generator = MermaidGenerator(self.tree_structure, self.formatter)
+        self.information_calculator = ValueOfInformationCalculator(self.tree_structure)
+        self.display_precision = display_precision
+        self._formatter = None
+        self._printer = None
+        self._mermaid_generator = None
+        self._exporter = None
         
         # Store utility function
         self.utility_function = utility_function
         
+    @property
+    def formatter(self) -> "PrecisionFormatter":
+        """Precision formatter, created on first use"""
+        if self._formatter is None:
+            from .formatters import PrecisionFormatter
+            self._formatter = PrecisionFormatter(self.display_precision)
+        return self._formatter
+        
+    @formatter.setter
+    def formatter(self, formatter: "PrecisionFormatter") -> None:
+        self._formatter = formatter
+        
+    @property
+    def printer(self) -> "TreePrinter":
+        """Text summary printer, created on first use"""
+        if self._printer is None:
+            from .formatters import TreePrinter
+            self._printer = TreePrinter(self.tree_structure, self.formatter)
+        return self._printer
+        
+    @printer.setter
+    def printer(self, printer: "TreePrinter") -> None:
+        self._printer = printer
+        
+    @property
+    def mermaid_generator(self) -> "MermaidGenerator":
+        """Mermaid diagram generator, created on first use"""
+        if self._mermaid_generator is None:
+            from .formatters import MermaidGenerator
+            self._mermaid_generator = MermaidGenerator(self.tree_structure, self.formatter)
+        return self._mermaid_generator
+        
+    @mermaid_generator.setter
+    def mermaid_generator(self, mermaid_generator: "MermaidGenerator") -> None:
+        self._mermaid_generator = mermaid_generator
+        
+    @property
+    def exporter(self) -> "ColumnarExporter":
+        """Columnar exporter, created on first use"""
+        if self._exporter is None:
+            from .columnar import ColumnarExporter
+            self._exporter = ColumnarExporter(self.tree_structure)
+        return self._exporter
+        
+    @exporter.setter
+    def exporter(self, exporter: "ColumnarExporter") -> None:
+        self._exporter = exporter
+        
     def add_decision_node(self, node_id: str, name: str) -> None:
         """Add a decision node to the tree"""
         node = Node(node_id, name, NodeType.DECISION)
@@ -63,44 +129,100 @@ class DecisionTree:
         edge = Edge(from_node, to_node, probability)
         self.tree_structure.add_edge(edge)
         
+    def set_terminal_value(self, node_id: str, value: float) -> None:
+        """Change the value of a terminal node"""
+        self.tree_structure.set_node_value(node_id, value)
+        
+    def set_probability(self, from_node: str, to_node: str, probability: float) -> None:
+        """Change the probability of the edge between two nodes"""
+        self.tree_structure.set_edge_probability(from_node, to_node, probability)
+        
+    def fork(self) -> "DecisionTree":
+        """
+        Create a copy-on-write snapshot of the decision tree for what-if analysis
+        
+        The fork is created in O(1): it shares the nodes, edges and cached results with this
+        tree, and only the nodes and edges changed afterwards (on either side) are copied.
+        Use set_terminal_value and set_probability to change a forked tree.
+        
+        Returns:
+            DecisionTree with the same utility function and display precision
+        """
+        return DecisionTree(self.display_precision, self.utility_function, self.tree_structure.fork())
+        
     def get_children(self, node_id: str) -> List[Tuple[str, float]]:
         """Get all children of a node with their probabilities"""
         return self.tree_structure.get_children(node_id)
         
-    def calculate_expected_values(self) -> Dict[str, dict]:
+    def get_roots(self) -> List[str]:
+        """Get all nodes without parents"""
+        return self.tree_structure.get_roots()
+        
+    def calculate_expected_values(self, root: Optional[str] = None) -> Dict[str, dict]:
         """
         Calculate both expected value and expected utility for all nodes in the tree using backward induction.
 
+        Args:
+            root: Optional node ID, if given only this node and its descendants are evaluated
+
         Returns:
             Dictionary mapping node_id to {'expected_value': ..., 'utility_value': ...}
         """
-        return self.calculate_both()
+        return self.calculate_both(root)
 
-    def calculate_both(self) -> Dict[str, dict]:
+    def calculate_both(self, root: Optional[str] = None) -> Dict[str, dict]:
         """
         Calculate both expected value and expected utility for all nodes (if utility function is present).
+        If root is given, only this node and its descendants are evaluated.
         Returns a dict mapping node_id to {'expected_value': ..., 'utility_value': ...}
         """
         if self.utility_function is not None:
-            return self.calculator.calculate_both(self.utility_function)
+            return self.calculator.calculate_both(self.utility_function, root)
         else:
             # If no utility function, just return expected values as 'expected_value'
-            ev = self.calculator.calculate_expected_values()
+            ev = self.calculator.calculate_expected_values(root)
             return {k: {'expected_value': v, 'utility_value': v} for k, v in ev.items()}
         
-    def calculate_raw_expected_values(self) -> Dict[str, float]:
+    def calculate_raw_expected_values(self, root: Optional[str] = None) -> Dict[str, float]:
         """
         Calculate expected values for all nodes without applying utility function
+        Args:
+            root: Optional node ID, if given only this node and its descendants are evaluated
         Returns:
             Dictionary mapping node_id to raw expected value (without utility function)
         """
-        return self.calculator.calculate_expected_values()
+        return self.calculator.calculate_expected_values(root)
         
-    def print_tree_summary(self) -> None:
-        """Print a summary of the tree with expected values using automatic precision"""
-        expected_values = self.calculate_expected_values()
-        raw_expected_values = self.calculate_raw_expected_values()
-        self.printer.print_tree_summary(expected_values, raw_expected_values, self.utility_function)
+    def print_tree_summary(self, root: Optional[str] = None) -> None:
+        """Print a summary of the tree (or of the subtree below root) with expected values using automatic precision"""
+        expected_values = self.calculate_expected_values(root)
+        raw_expected_values = self.calculate_raw_expected_values(root)
+        self.printer.print_tree_summary(expected_values, raw_expected_values, self.utility_function, root)
+        
+    def write_tree_summary(self, stream: Optional[TextIO] = None, root: Optional[str] = None,
+                           max_depth: Optional[int] = None, max_nodes: Optional[int] = None,
+                           optimal_path_only: bool = False, json_lines: bool = False) -> Optional[str]:
+        """
+        Write a summary of the tree to a text stream, or return it as a string
+        
+        Args:
+            stream: Text stream to write to (e.g. a file or sys.stdout). If None, the summary is returned
+            root: Optional node ID to start from, by default all roots of the tree are used
+            max_depth: Optional maximum depth below the root(s) to show
+            max_nodes: Optional maximum number of nodes to show
+            optimal_path_only: Whether to show only the nodes on the optimal path
+            json_lines: Whether to write one JSON object per node instead of plain text
+            
+        Returns:
+            The summary as a string if no stream is given, otherwise None
+        """
+        expected_values = self.calculate_expected_values(root)
+        raw_expected_values = self.calculate_raw_expected_values(root)
+        optimal_path_nodes = self._get_optimal_path_nodes(root) if optimal_path_only else None
+        
+        write = self.printer.write_tree_summary_jsonl if json_lines else self.printer.write_tree_summary
+        return write(expected_values, raw_expected_values, self.utility_function, stream, root,
+                     max_depth, max_nodes, optimal_path_nodes)
         
     def get_optimal_path(self, start_node: str, maximize: bool = True) -> List[str]:
         """
@@ -115,34 +237,167 @@ class DecisionTree:
         """
         return self.path_finder.get_optimal_path(start_node, maximize, self.utility_function)
 
-    def generate_mermaid_diagram(self, show_expected_values: bool = True) -> str:
+    def _get_optimal_path_nodes(self, root: Optional[str] = None) -> List[str]:
+        """Get the nodes on the optimal path from root, or from every root of the tree"""
+        optimal_path_nodes = []
+        for start_node in ([root] if root is not None else self.get_roots()):
+            optimal_path_nodes.extend(self.get_optimal_path(start_node))
+        return optimal_path_nodes
+
+    def export_nodes(self) -> Dict[str, "np.ndarray"]:
+        """
+        Export the nodes and their results as columns
+        
+        Returns:
+            Dict mapping column name (node_id, name, node_type, value, expected_value, utility_value,
+            depth, parent, on_optimal_path) to a numpy array
+        """
+        return self.exporter.export_nodes(self.calculate_both(), self._get_optimal_path_nodes())
+
+    def export_node_records(self) -> "np.recarray":
+        """Export the nodes and their results as a numpy record array"""
+        return self.exporter.export_node_records(self.calculate_both(), self._get_optimal_path_nodes())
+
+    def export_edges(self) -> Dict[str, "np.ndarray"]:
+        """
+        Export the edges as columns
+        
+        Returns:
+            Dict mapping column name (from_node, to_node, probability) to a numpy array
+        """
+        return self.exporter.export_edges()
+
+    def to_arrow(self) -> Tuple[Any, Any]:
+        """
+        Export the nodes (with results) and edges as Arrow tables, requires pyarrow
+        
+        Returns:
+            Tuple of (nodes_table, edges_table)
+        """
+        return self.exporter.to_arrow(self.calculate_both(), self._get_optimal_path_nodes())
+
+    def write_csv(self, nodes_stream: TextIO, edges_stream: TextIO) -> None:
+        """
+        Write the nodes (with results) and edges as CSV
+        
+        Args:
+            nodes_stream: Text stream for the node columns
+            edges_stream: Text stream for the edge columns
+        """
+        self.exporter.write_csv(self.export_nodes(), nodes_stream)
+        self.exporter.write_csv(self.export_edges(), edges_stream)
+
+    @classmethod
+    def from_columns(cls, nodes: Any, edges: Any, display_precision: Optional[int] = None,
+                     utility_function: Optional[Callable[[float], float]] = None) -> "DecisionTree":
+        """
+        Build a decision tree in bulk from node and edge columns
+        
+        Args:
+            nodes: Dict of columns (or numpy record array) with node_id, node_type and optionally name and value
+            edges: Dict of columns (or numpy record array) with from_node, to_node and optionally probability
+            display_precision: Fixed precision for display purposes
+            utility_function: Optional utility function
+            
+        Returns:
+            DecisionTree with all nodes and edges
+        """
+        from .columnar import ColumnarImporter
+        tree_structure = ColumnarImporter().build_tree_structure(nodes, edges)
+        return cls(display_precision, utility_function, tree_structure)
+
+    @classmethod
+    def from_csv(cls, nodes_stream: TextIO, edges_stream: TextIO, display_precision: Optional[int] = None,
+                 utility_function: Optional[Callable[[float], float]] = None) -> "DecisionTree":
+        """
+        Build a decision tree from node and edge CSV streams, as written by write_csv
+        
+        Returns:
+            DecisionTree with all nodes and edges
+        """
+        from .columnar import ColumnarImporter
+        nodes = ColumnarImporter.read_csv(nodes_stream)
+        edges = ColumnarImporter.read_csv(edges_stream)
+        return cls.from_columns(nodes, edges, display_precision, utility_function)
+
+    def calculate_evpi(self, node_ids: Union[str, Iterable[str]]) -> float:
+        """
+        Calculate the expected value of perfect information for one or more chance nodes
+        
+        Args:
+            node_ids: A chance node ID or an iterable of chance node IDs resolved before any decision
+            
+        Returns:
+            EVPI (in utility units if a utility function is provided)
+        """
+        return self.information_calculator.calculate_evpi(node_ids, self.utility_function)
+
+    def calculate_evsi(self, node_id: str, signal: Dict[str, Dict[str, float]]) -> float:
+        """
+        Calculate the expected value of sample information for an imperfect signal on a chance node
+        
+        Args:
+            node_id: Chance node ID the signal gives information about
+            signal: Dict mapping each signal outcome to a dict of {child_id: P(signal | child)}
+            
+        Returns:
+            EVSI (in utility units if a utility function is provided)
+        """
+        return self.information_calculator.calculate_evsi(node_id, signal, self.utility_function)
+
+    def rank_evpi(self) -> List[Tuple[str, float]]:
+        """
+        Rank every chance node by its expected value of perfect information
+        
+        Returns:
+            List of (node_id, evpi) tuples sorted by decreasing EVPI
+        """
+        return self.information_calculator.rank_evpi(self.utility_function)
+
+    def reduce_tree(self, prune_dominated: bool = True) -> ReducedTree:
+        """
+        Build a smaller equivalent tree for repeated evaluations
+        
+        Args:
+            prune_dominated: Whether to drop decision alternatives dominated by a sibling, the reduced
+                tree then only holds for maximizing with this tree's utility function
+            
+        Returns:
+            ReducedTree with the reduced structure and the mapping back to the original node IDs
+        """
+        return TreeReducer(self.tree_structure, self.utility_function).reduce(prune_dominated)
+
+    def generate_mermaid_diagram(self, show_expected_values: bool = True, root: Optional[str] = None) -> str:
         """
         Generate a modern Mermaid diagram representation of the decision tree
         
         Args:
             show_expected_values: Whether to show expected values in nodes
+            root: Optional node ID, if given only this node and its descendants are shown
             
         Returns:
             String containing the Mermaid diagram code
         """
-        expected_values = self.calculate_both()
-        raw_expected_values = self.calculate_raw_expected_values()
-        optimal_path_nodes = self.get_optimal_path(next(iter(self.tree_structure.nodes)))
+        expected_values = self.calculate_both(root)
+        raw_expected_values = self.calculate_raw_expected_values(root)
+        optimal_path_nodes = self._get_optimal_path_nodes(root)
         
         return self.mermaid_generator.generate_diagram(
             expected_values, raw_expected_values, optimal_path_nodes, 
-            show_expected_values, self.utility_function
+            show_expected_values, self.utility_function, root
         )
     
-    def save_mermaid_diagram(self, filename: str = "decision_tree.md", show_expected_values: bool = True) -> None:
+    def save_mermaid_diagram(self, filename: str = "decision_tree.md", show_expected_values: bool = True,
+                             root: Optional[str] = None) -> None:
         """
         Save the Mermaid diagram to a markdown file
         
         Args:
             filename: Output filename (should end with .md)
             show_expected_values: Whether to show expected values in nodes
+            root: Optional node ID, if given only this node and its descendants are shown
         """
-        mermaid_code = self.generate_mermaid_diagram(show_expected_values)
+        mermaid_code = self.generate_mermaid_diagram(show_expected_values, root)
         
         markdown_content = f"""
 ```mermaid
@@ -155,21 +410,24 @@ class DecisionTree:
         
         print(f"Mermaid diagram saved to {filename}")
 
-    def save_mermaid_graph(self, filename: str = "decision_tree.png", show_expected_values: bool = True) -> None:
+    def save_mermaid_graph(self, filename: str = "decision_tree.png", show_expected_values: bool = True,
+                           root: Optional[str] = None) -> None:
         """
         Save the Mermaid diagram as a PNG image
         
         Args:
             filename: Output filename (should end with .png)
             show_expected_values: Whether to show expected values in nodes
+            root: Optional node ID, if given only this node and its descendants are shown
         """
-        if Mermaid is None:
+        mermaid_class = globals()["Mermaid"] if "Mermaid" in globals() else __getattr__("Mermaid")
+        if mermaid_class is None:
             raise ImportError(
                 "The 'mermaid' Python package is required for saving graphs as PNG."
                 " Install it via 'pip install mermaid' or use 'save_mermaid_diagram' to"
                 " export a markdown diagram instead."
             )
 
-        mermaid_code = self.generate_mermaid_diagram(show_expected_values)
-        mermaid = Mermaid(mermaid_code)
+        mermaid_code = self.generate_mermaid_diagram(show_expected_values, root)
+        mermaid = mermaid_class(mermaid_code)
         mermaid.to_png(filename)
\ No newline at end of file
@@ -1,9 +1,18 @@
 """
 Formatting and display logic for decision trees
 """
+import io
+import json
 import math
-from typing import List, Dict, Callable, Optional
-from .models import TreeStructure, NodeType
+import sys
+from typing import List, Dict, Callable, Optional, TextIO, Iterator, Tuple
+from .models import Node, TreeStructure, NodeType
+
+def _get_subtree_nodes(tree_structure: TreeStructure, root: Optional[str]) -> Dict[str, Node]:
+    """Get the nodes to display: the whole tree, or the root and its descendants"""
+    if root is None:
+        return tree_structure.nodes
+    return {node_id: tree_structure.nodes[node_id] for node_id in tree_structure.get_descendants(root)}
 
 class PrecisionFormatter:
     """Handles precision formatting for display purposes"""
@@ -60,19 +69,42 @@ class PrecisionFormatter:
 class TreePrinter:
     """Handles printing and text representation of decision trees"""
     
+    # Number of lines collected before each write to the output stream
+    buffer_lines = 4096
+    
     def __init__(self, tree_structure: TreeStructure, formatter: PrecisionFormatter):
         self.tree_structure = tree_structure
         self.formatter = formatter
     
     def print_tree_summary(self, expected_values: Dict, raw_expected_values: Dict, 
-                          utility_function: Optional[Callable[[float], float]] = None):
-        """Print a summary of the tree with expected values"""
+                          utility_function: Optional[Callable[[float], float]] = None,
+                          root: Optional[str] = None):
+        """Print a summary of the tree (or of the subtree below root) with expected values"""
+        self.write_tree_summary(expected_values, raw_expected_values, utility_function, sys.stdout, root)
+    
+    def write_tree_summary(self, expected_values: Dict, raw_expected_values: Dict,
+                           utility_function: Optional[Callable[[float], float]] = None,
+                           stream: Optional[TextIO] = None, root: Optional[str] = None,
+                           max_depth: Optional[int] = None, max_nodes: Optional[int] = None,
+                           optimal_path_nodes: Optional[List[str]] = None) -> Optional[str]:
+        """
+        Write a summary of the tree with expected values to a text stream
+        
+        Args:
+            expected_values: Dict mapping node_id to {'expected_value': ..., 'utility_value': ...}
+            raw_expected_values: Dict mapping node_id to raw expected value
+            utility_function: Optional utility function, if given utility values are shown
+            stream: Text stream to write to. If None, the summary is returned as a string
+            root: Optional node ID to start from, by default all roots of the tree are used
+            max_depth: Optional maximum depth below the root(s) to show
+            max_nodes: Optional maximum number of nodes to show
+            optimal_path_nodes: Optional list of node IDs, if given only these nodes are shown
+            
+        Returns:
+            The summary as a string if no stream is given, otherwise None
+        """
         # Get all values for precision calculation
-        all_values = []
-        for node in self.tree_structure.nodes.values():
-            if node.node_type == NodeType.TERMINAL:
-                all_values.append(node.value)
-        all_values.extend(raw_expected_values.values())
+        all_values = list(raw_expected_values.values())
         if utility_function is not None:
             # Extract utility values for precision calculation
             utility_values = [v['utility_value'] for v in expected_values.values() if isinstance(v, dict)]
@@ -81,39 +113,106 @@ class TreePrinter:
         # Get appropriate display precision
         precision = self.formatter.get_display_precision(all_values)
         
-        print("Decision Tree Summary:")
-        print("=" * 50)
-        
-        for node_id, node in self.tree_structure.nodes.items():
-            print(f"{node.node_type.value.upper()}: {node.name} ({node_id})")
+        def render_node(node_id: str, depth: int) -> List[str]:
+            node = self.tree_structure.nodes[node_id]
+            lines = [f"{node.node_type.value.upper()}: {node.name} ({node_id})"]
             if node.node_type == NodeType.TERMINAL:
-                print(f"  Terminal Value: {node.value:,.{precision}f}")
-                if utility_function is not None:
-                    utility_val = expected_values[node_id]['utility_value']
-                    raw_ev = expected_values[node_id]['expected_value']
-                    print(f"  Utility Value: {utility_val:,.{precision}f}")
-                    print(f"  Expected Value: {raw_ev:,.{precision}f}")
-                else:
-                    print(f"  Expected Value: {expected_values[node_id]['expected_value']:,.{precision}f}")
+                lines.append(f"  Terminal Value: {node.value:,.{precision}f}")
+            if utility_function is not None:
+                utility_val = expected_values[node_id]['utility_value']
+                raw_ev = expected_values[node_id]['expected_value']
+                lines.append(f"  Utility Value: {utility_val:,.{precision}f}")
+                lines.append(f"  Expected Value: {raw_ev:,.{precision}f}")
             else:
-                # Show expected values for non-terminal nodes
-                if utility_function is not None:
-                    utility_val = expected_values[node_id]['utility_value']
-                    raw_ev = expected_values[node_id]['expected_value']
-                    print(f"  Utility Value: {utility_val:,.{precision}f}")
-                    print(f"  Expected Value: {raw_ev:,.{precision}f}")
-                else:
-                    print(f"  Expected Value: {expected_values[node_id]['expected_value']:,.{precision}f}")
+                lines.append(f"  Expected Value: {expected_values[node_id]['expected_value']:,.{precision}f}")
             
             # Show children
             children = self.tree_structure.get_children(node_id)
             if children:
-                print("  Children:")
+                lines.append("  Children:")
                 for child_id, prob in children:
                     child_name = self.tree_structure.nodes[child_id].name
                     prob_str = self.formatter.format_probability_as_percentage(prob)
-                    print(f"    -> {child_name} ({child_id}) [{prob_str}]")
-            print()
+                    lines.append(f"    -> {child_name} ({child_id}) [{prob_str}]")
+            lines.append("")
+            return lines
+        
+        header = ["Decision Tree Summary:", "=" * 50]
+        return self._write_lines(header, render_node, stream, root, max_depth, max_nodes, optimal_path_nodes)
+    
+    def write_tree_summary_jsonl(self, expected_values: Dict, raw_expected_values: Dict,
+                                 utility_function: Optional[Callable[[float], float]] = None,
+                                 stream: Optional[TextIO] = None, root: Optional[str] = None,
+                                 max_depth: Optional[int] = None, max_nodes: Optional[int] = None,
+                                 optimal_path_nodes: Optional[List[str]] = None) -> Optional[str]:
+        """
+        Write a summary of the tree as JSON Lines, one object per node
+        
+        Takes the same arguments as write_tree_summary.
+        
+        Returns:
+            The summary as a string if no stream is given, otherwise None
+        """
+        def render_node(node_id: str, depth: int) -> List[str]:
+            node = self.tree_structure.nodes[node_id]
+            record = {
+                "node_id": node_id,
+                "name": node.name,
+                "node_type": node.node_type.value,
+                "depth": depth,
+                "value": None if node.value is None else float(node.value),
+                "expected_value": float(expected_values[node_id]['expected_value']),
+            }
+            if utility_function is not None:
+                record["utility_value"] = float(expected_values[node_id]['utility_value'])
+            record["children"] = [
+                {"node_id": child_id, "probability": prob}
+                for child_id, prob in self.tree_structure.get_children(node_id)
+            ]
+            return [json.dumps(record)]
+        
+        return self._write_lines([], render_node, stream, root, max_depth, max_nodes, optimal_path_nodes)
+    
+    def _iter_nodes(self, root: Optional[str], max_depth: Optional[int], max_nodes: Optional[int],
+                    optimal_path_nodes: Optional[List[str]]) -> Iterator[Tuple[str, int]]:
+        """Yield (node_id, depth) in depth-first order, applying the depth, budget and path filters"""
+        allowed = set(optimal_path_nodes) if optimal_path_nodes is not None else None
+        roots = [root] if root is not None else self.tree_structure.get_roots()
+        stack = [(root_id, 0) for root_id in reversed(roots) if allowed is None or root_id in allowed]
+        visited = set()
+        count = 0
+        while stack:
+            node_id, depth = stack.pop()
+            if node_id in visited:
+                continue
+            if max_nodes is not None and count >= max_nodes:
+                return
+            visited.add(node_id)
+            count += 1
+            yield node_id, depth
+            if max_depth is not None and depth >= max_depth:
+                continue
+            for child_id, _ in reversed(self.tree_structure.get_children(node_id)):
+                if allowed is None or child_id in allowed:
+                    stack.append((child_id, depth + 1))
+    
+    def _write_lines(self, header: List[str], render_node: Callable[[str, int], List[str]],
+                     stream: Optional[TextIO], root: Optional[str], max_depth: Optional[int],
+                     max_nodes: Optional[int], optimal_path_nodes: Optional[List[str]]) -> Optional[str]:
+        """Render the selected nodes and write them to the stream in batches"""
+        output = io.StringIO() if stream is None else stream
+        buffer = list(header)
+        for node_id, depth in self._iter_nodes(root, max_depth, max_nodes, optimal_path_nodes):
+            buffer.extend(render_node(node_id, depth))
+            if len(buffer) >= self.buffer_lines:
+                output.write("\n".join(buffer) + "\n")
+                buffer = []
+        if buffer:
+            output.write("\n".join(buffer) + "\n")
+        
+        if stream is None:
+            return output.getvalue()
+        return None
 
 class MermaidGenerator:
     """Handles Mermaid diagram generation"""
@@ -124,11 +223,18 @@ class MermaidGenerator:
     
     def generate_diagram(self, expected_values: Dict, raw_expected_values: Dict,
                         optimal_path_nodes: List[str], show_expected_values: bool = True,
-                        utility_function: Optional[Callable[[float], float]] = None) -> str:
-        """Generate a Mermaid diagram representation of the decision tree"""
+                        utility_function: Optional[Callable[[float], float]] = None,
+                        root: Optional[str] = None) -> str:
+        """Generate a Mermaid diagram representation of the decision tree (or of the subtree below root)"""
+        nodes = _get_subtree_nodes(self.tree_structure, root)
+        if root is None:
+            edges = self.tree_structure.edges
+        else:
+            edges = [edge for node_id in nodes for edge in self.tree_structure.get_outgoing_edges(node_id)]
+        
         # Get all values for precision calculation
         all_values = []
-        for node in self.tree_structure.nodes.values():
+        for node in nodes.values():
             if node.node_type == NodeType.TERMINAL:
                 all_values.append(node.value)
         all_values.extend(raw_expected_values.values())
@@ -159,7 +265,7 @@ class MermaidGenerator:
         ])
         
         # Add nodes with enhanced styling
-        for node_id, node in self.tree_structure.nodes.items():
+        for node_id, node in nodes.items():
             label_parts = [f"<b>{node.name}</b>"]
             
             # Add values to label with better formatting
@@ -200,7 +306,7 @@ class MermaidGenerator:
         # Add edges with enhanced styling
         link_styles = []
         edge_count = 0
-        for edge in self.tree_structure.edges:
+        for edge in edges:
             # Format probability as percentage
             if edge.probability == 1.0:
                 prob_label = ""
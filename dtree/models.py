@@ -1,6 +1,8 @@
-from typing import Optional, List, Tuple
+from typing import Optional, List, Tuple, Any, Dict, Set, Callable, Iterator
+from collections import ChainMap
+from collections.abc import MutableSequence, Sequence
 from enum import Enum
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, replace
 
 class NodeType(Enum):
     DECISION = "decision"
@@ -45,17 +47,142 @@ class Edge:
         if self.from_node == self.to_node:
             raise ValueError("Edge cannot connect a node to itself")
 
+# A layer on top of shared data is merged into a plain container once it holds more than
+# 1/_MERGE_RATIO of the shared items, which keeps every lookup at most two levels deep
+_MERGE_RATIO = 8
+
+class _LayeredEdgeList(MutableSequence):
+    """Edge list on top of a read-only base list, only changed and appended edges are stored"""
+    
+    def __init__(self, base: list, overrides: Optional[Dict[Tuple[str, str], Edge]] = None,
+                 appended: Optional[List[Edge]] = None):
+        self._base = base
+        # Changed base edges, keyed by (from_node, to_node)
+        self._overrides = overrides if overrides is not None else {}
+        self._appended = appended if appended is not None else []
+    
+    @property
+    def layer_size(self) -> int:
+        """Number of edges stored in this layer"""
+        return len(self._overrides) + len(self._appended)
+    
+    def copy_layer(self) -> "_LayeredEdgeList":
+        """Copy this layer, sharing the same base list"""
+        return _LayeredEdgeList(self._base, dict(self._overrides), list(self._appended))
+    
+    def replace_edge(self, old_edge: Edge, new_edge: Edge) -> None:
+        """Replace an edge of the list with a new one"""
+        for index, edge in enumerate(self._appended):
+            if edge is old_edge:
+                self._appended[index] = new_edge
+                return
+        self._overrides[(old_edge.from_node, old_edge.to_node)] = new_edge
+    
+    def __len__(self) -> int:
+        return len(self._base) + len(self._appended)
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("list index out of range")
+        if index >= len(self._base):
+            return self._appended[index - len(self._base)]
+        edge = self._base[index]
+        return self._overrides.get((edge.from_node, edge.to_node), edge)
+    
+    def __iter__(self) -> Iterator[Edge]:
+        if self._overrides:
+            overrides = self._overrides
+            for edge in self._base:
+                yield overrides.get((edge.from_node, edge.to_node), edge)
+        else:
+            yield from self._base
+        yield from self._appended
+    
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Sequence):
+            return list(self) == list(other)
+        return NotImplemented
+    
+    __hash__ = None
+    
+    def __repr__(self) -> str:
+        return repr(list(self))
+    
+    def append(self, edge: Edge) -> None:
+        self._appended.append(edge)
+    
+    def __setitem__(self, index, value) -> None:
+        self._materialize()
+        self._base[index] = value
+    
+    def __delitem__(self, index) -> None:
+        self._materialize()
+        del self._base[index]
+    
+    def insert(self, index: int, value: Edge) -> None:
+        self._materialize()
+        self._base.insert(index, value)
+    
+    def _materialize(self) -> None:
+        """Replace the shared base by a private copy so it can be changed in place"""
+        self._base = list(self)
+        self._overrides = {}
+        self._appended = []
+
+class _ValueCache:
+    """Results of the last full evaluation per calculation key, with the nodes changed since then"""
+    
+    def __init__(self, entries: Optional[Dict[Any, Tuple[Dict[str, float], Set[str]]]] = None):
+        # The value dicts are never changed once stored, so forks can share them
+        self.entries = entries if entries is not None else {}
+    
+    def fork(self) -> "_ValueCache":
+        return _ValueCache({key: (values, set(changed)) for key, (values, changed) in self.entries.items()})
+    
+    def get(self, key: Any) -> Tuple[Optional[Dict[str, float]], Set[str]]:
+        return self.entries.get(key, (None, set()))
+    
+    def set(self, key: Any, values: Dict[str, float]) -> None:
+        self.entries[key] = (values, set())
+    
+    def invalidate(self, node_ids: Set[str]) -> None:
+        for _, changed in self.entries.values():
+            changed.update(node_ids)
+
 @dataclass
 class TreeStructure:
-    """Manages the structure of a decision tree"""
+    """
+    Manages the structure of a decision tree
+
+    Parent and child indexes are kept next to the edges. Change the tree through add_node,
+    add_edge, set_node_value and set_edge_probability; edges appended to the edges list
+    directly are picked up by rebuilding the indexes, which also drops cached evaluations.
+    """
     nodes: dict[str, Node] = field(default_factory=dict)
     edges: list[Edge] = field(default_factory=list)
+    _children: dict[str, list[Edge]] = field(default_factory=dict, init=False, repr=False, compare=False)
+    _parents: dict[str, list[Edge]] = field(default_factory=dict, init=False, repr=False, compare=False)
+    _edge_count: int = field(default=0, init=False, repr=False, compare=False)
+    _cache: Optional[_ValueCache] = field(default=None, init=False, repr=False, compare=False)
+    _shared: bool = field(default=False, init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        """Build the parent and child indexes for the given nodes and edges"""
+        self._build_index()
     
     def add_node(self, node: Node) -> None:
         """Add a node to the tree"""
         if node.node_id in self.nodes:
             raise ValueError(f"Node with ID '{node.node_id}' already exists")
+        self._before_write()
         self.nodes[node.node_id] = node
+        self._children[node.node_id] = []
+        self._parents[node.node_id] = []
+        self._invalidate(node.node_id)
     
     def add_edge(self, edge: Edge) -> None:
         """Add an edge to the tree"""
@@ -63,29 +190,200 @@ class TreeStructure:
             raise ValueError(f"From node '{edge.from_node}' does not exist")
         if edge.to_node not in self.nodes:
             raise ValueError(f"To node '{edge.to_node}' does not exist")
+        self._check_index()
+        self._before_write()
         self.edges.append(edge)
+        self._edge_count += 1
+        self._get_own_list(self._children, edge.from_node).append(edge)
+        self._get_own_list(self._parents, edge.to_node).append(edge)
+        self._invalidate(edge.from_node)
+    
+    def set_node_value(self, node_id: str, value: float) -> None:
+        """Change the value of a terminal node"""
+        if node_id not in self.nodes:
+            raise ValueError(f"Node '{node_id}' does not exist")
+        node = replace(self.nodes[node_id], value=value, expected_value=None)
+        self._before_write()
+        self.nodes[node_id] = node
+        self._invalidate(node_id)
+    
+    def set_edge_probability(self, from_node: str, to_node: str, probability: float) -> None:
+        """Change the probability of the edge(s) between two nodes"""
+        if from_node not in self.nodes:
+            raise ValueError(f"Node '{from_node}' does not exist")
+        self._check_index()
+        old_edges = [edge for edge in self._children.get(from_node, []) if edge.to_node == to_node]
+        if not old_edges:
+            raise ValueError(f"Edge from '{from_node}' to '{to_node}' does not exist")
+        new_edge = Edge(from_node, to_node, probability)
+        self._before_write()
+        for index, node_id in [(self._children, from_node), (self._parents, to_node)]:
+            edges = self._get_own_list(index, node_id)
+            edges[:] = [new_edge if edge.from_node == from_node and edge.to_node == to_node else edge
+                        for edge in edges]
+        if isinstance(self.edges, _LayeredEdgeList):
+            for old_edge in old_edges:
+                self.edges.replace_edge(old_edge, new_edge)
+        else:
+            self.edges[:] = [new_edge if edge.from_node == from_node and edge.to_node == to_node else edge
+                             for edge in self.edges]
+        self._invalidate(from_node)
+    
+    def fork(self) -> "TreeStructure":
+        """
+        Create a snapshot of the tree that can be changed independently of this one.
+        
+        Forking is O(1): nodes, edges and cached results are shared, and the first change on
+        either side only copies the nodes and edges it changes. Change shared trees through
+        add_node, add_edge, set_node_value and set_edge_probability rather than by editing
+        Node or Edge objects. Trees that take part in snapshots cache their evaluations and
+        do not update Node.expected_value, since the nodes are shared.
+        """
+        if self._cache is None:
+            self._cache = _ValueCache()
+        self._shared = True
+        
+        snapshot = TreeStructure.__new__(TreeStructure)
+        snapshot.nodes = self.nodes
+        snapshot.edges = self.edges
+        snapshot._children = self._children
+        snapshot._parents = self._parents
+        snapshot._edge_count = self._edge_count
+        snapshot._cache = self._cache
+        snapshot._shared = True
+        return snapshot
+    
+    def has_snapshots(self) -> bool:
+        """Whether the tree was forked or is a fork, in which case evaluations are cached"""
+        return self._cache is not None
+    
+    def get_cached_values(self, key: Any = None) -> Tuple[Optional[Dict[str, float]], Set[str]]:
+        """
+        Get the cached values of the last full evaluation (key identifies the calculation)
+        together with the nodes whose values changed since. Values are None if not cached.
+        """
+        self._check_index()
+        if self._cache is None:
+            return None, set()
+        return self._cache.get(key)
+    
+    def cache_values(self, values: Dict[str, float], key: Any = None) -> None:
+        """Cache the values of a full evaluation, the dict must not be changed afterwards"""
+        if self._cache is not None:
+            self._cache.set(key, values)
+    
+    def _before_write(self) -> None:
+        """Take private copies of the layers shared with other snapshots before changing them"""
+        if not self._shared:
+            return
+        self.nodes = self._unshare_index(self.nodes, lambda node: node)
+        self._children = self._unshare_index(self._children, list)
+        self._parents = self._unshare_index(self._parents, list)
+        if isinstance(self.edges, _LayeredEdgeList):
+            if self.edges.layer_size * _MERGE_RATIO > len(self.edges):
+                self.edges = list(self.edges)
+            else:
+                self.edges = self.edges.copy_layer()
+        else:
+            self.edges = _LayeredEdgeList(self.edges)
+        self._cache = self._cache.fork()
+        self._shared = False
+    
+    @staticmethod
+    def _unshare_index(mapping: dict, copy_value: Callable[[Any], Any]) -> dict:
+        """Copy the private layer of a shared index, or merge it into a plain dict once it grows"""
+        if not isinstance(mapping, ChainMap):
+            return ChainMap({}, mapping)
+        layer, base = mapping.maps
+        if len(layer) * _MERGE_RATIO > len(base):
+            return {key: copy_value(value) for key, value in mapping.items()}
+        return ChainMap({key: copy_value(value) for key, value in layer.items()}, base)
+    
+    def _build_index(self) -> None:
+        """Build the parent and child indexes from the nodes and edges"""
+        self._children = {node_id: [] for node_id in self.nodes}
+        self._parents = {node_id: [] for node_id in self.nodes}
+        for edge in self.edges:
+            self._children.setdefault(edge.from_node, []).append(edge)
+            self._parents.setdefault(edge.to_node, []).append(edge)
+        self._edge_count = len(self.edges)
+    
+    def _check_index(self) -> None:
+        """Rebuild the indexes if edges were added to the edges list directly"""
+        if len(self.edges) != self._edge_count:
+            self._build_index()
+            if self._cache is not None:
+                # The cached evaluations did not see the new edges
+                self._cache = _ValueCache()
+    
+    @staticmethod
+    def _get_own_list(index: dict, node_id: str) -> list:
+        """Get an edge list of an index, copying it first if it belongs to the shared layer"""
+        if isinstance(index, ChainMap) and node_id not in index.maps[0]:
+            index[node_id] = list(index.get(node_id, []))
+        return index.setdefault(node_id, [])
+    
+    def _invalidate(self, node_id: str) -> None:
+        """Mark a node and all of its ancestors as changed in the cached evaluations"""
+        if self._cache is None or not self._cache.entries:
+            return
+        self._check_index()
+        stack = [node_id]
+        visited = set()
+        while stack:
+            current = stack.pop()
+            if current in visited:
+                continue
+            visited.add(current)
+            stack.extend(edge.from_node for edge in self._parents.get(current, []))
+        self._cache.invalidate(visited)
     
     def get_children(self, node_id: str) -> List[Tuple[str, float]]:
         """Get all children of a node with their probabilities"""
         if node_id not in self.nodes:
             raise ValueError(f"Node '{node_id}' does not exist")
         
-        children = []
-        for edge in self.edges:
-            if edge.from_node == node_id:
-                children.append((edge.to_node, edge.probability))
-        return children
+        self._check_index()
+        return [(edge.to_node, edge.probability) for edge in self._children.get(node_id, [])]
+    
+    def get_outgoing_edges(self, node_id: str) -> List[Edge]:
+        """Get all edges leaving a node"""
+        if node_id not in self.nodes:
+            raise ValueError(f"Node '{node_id}' does not exist")
+        
+        self._check_index()
+        return list(self._children.get(node_id, []))
     
     def get_parents(self, node_id: str) -> List[Tuple[str, float]]:
         """Get all parents of a node with their probabilities"""
         if node_id not in self.nodes:
             raise ValueError(f"Node '{node_id}' does not exist")
         
-        parents = []
-        for edge in self.edges:
-            if edge.to_node == node_id:
-                parents.append((edge.from_node, edge.probability))
-        return parents
+        self._check_index()
+        return [(edge.from_node, edge.probability) for edge in self._parents.get(node_id, [])]
+    
+    def get_roots(self) -> List[str]:
+        """Get all nodes without parents"""
+        self._check_index()
+        return [node_id for node_id in self.nodes if not self._parents.get(node_id)]
+    
+    def get_descendants(self, node_id: str) -> List[str]:
+        """Get a node and all nodes reachable from it, in depth-first order"""
+        if node_id not in self.nodes:
+            raise ValueError(f"Node '{node_id}' does not exist")
+        
+        self._check_index()
+        descendants = []
+        visited = set()
+        stack = [node_id]
+        while stack:
+            current = stack.pop()
+            if current in visited:
+                continue
+            visited.add(current)
+            descendants.append(current)
+            stack.extend(edge.to_node for edge in reversed(self._children.get(current, [])))
+        return descendants
     
     def validate_tree(self) -> bool:
         """Validate that the tree structure is consistent"""
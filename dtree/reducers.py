@@ -0,0 +1,232 @@
+"""
+Reduction logic for decision trees
+"""
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple, Callable, Optional
+from .models import Node, Edge, NodeType, TreeStructure
+from .calculators import ExpectedValueCalculator
+
+@dataclass
+class ReducedTree:
+    """
+    Result of a reduction pass: a smaller equivalent tree plus the mapping back to the original one.
+
+    node_map maps every original node ID to the reduced node that represents it: kept nodes map
+    to themselves, spliced pass-through nodes to their child, merged chance nodes to the chance
+    node that absorbed them and pruned (dominated) nodes to None.
+
+    If prune_dominated is set, the tree only holds for maximizing the utility function it was
+    reduced with, other utility functions and minimizing paths are rejected.
+    """
+    tree_structure: TreeStructure
+    original_structure: TreeStructure
+    node_map: Dict[str, Optional[str]] = field(default_factory=dict)
+    prune_dominated: bool = False
+    utility_function: Optional[Callable[[float], float]] = None
+    _original_children: Dict[str, List[Tuple[str, float]]] = field(default_factory=dict, repr=False)
+
+    def calculate_expected_values(self, utility_function: Optional[Callable[[float], float]] = None,
+                                  expand: bool = False) -> Dict[str, float]:
+        """
+        Evaluate the reduced tree
+
+        Args:
+            utility_function: Optional utility function, must be the one the tree was reduced with if
+                dominated alternatives were pruned
+            expand: If True, report the values with the original node IDs, including spliced and
+                merged nodes. Pruned nodes are never part of the result.
+
+        Returns:
+            Dict mapping node_id to expected value (or utility)
+        """
+        self._check_utility_function(utility_function)
+        calculator = ExpectedValueCalculator(self.tree_structure)
+        if utility_function is not None:
+            values = calculator.calculate_expected_utilities(utility_function)
+        else:
+            values = calculator.calculate_expected_values()
+        return self.expand_values(values) if expand else values
+
+    def expand_values(self, values: Dict[str, float]) -> Dict[str, float]:
+        """Extend values of the reduced nodes to the spliced and merged nodes of the original tree"""
+        expanded = dict(values)
+        for node_id, reduced_id in self.node_map.items():
+            if reduced_id is not None:
+                self._expand_node_value(node_id, expanded)
+        return {node_id: expanded[node_id] for node_id in self.original_structure.nodes if node_id in expanded}
+
+    def get_optimal_path(self, start_node: str, maximize: bool = True,
+                         utility_function: Optional[Callable[[float], float]] = None) -> List[str]:
+        """
+        Get the optimal path from a starting node, using the original node IDs
+
+        The reduced tree is evaluated once, only the spliced and merged nodes next to the path
+        get their values expanded.
+
+        Args:
+            start_node: Starting node ID of the original tree
+            maximize: If True, maximize expected value; if False, minimize
+            utility_function: Optional utility function for decision making
+
+        Returns:
+            List of original node IDs representing the optimal path
+        """
+        if self.node_map.get(start_node) is None:
+            raise ValueError(f"Node '{start_node}' does not exist or was pruned")
+        if not maximize and self.prune_dominated:
+            raise ValueError("Minimizing paths are not supported on a tree with pruned alternatives,"
+                             " reduce it with prune_dominated=False")
+        values = self.calculate_expected_values(utility_function)
+        path = [start_node]
+        current = start_node
+        while True:
+            children = [child_id for child_id, _ in self._original_children[current]
+                        if self.node_map[child_id] is not None]
+            if not children:
+                break
+            child_values = {child_id: self._expand_node_value(child_id, values) for child_id in children}
+            if maximize:
+                current = max(children, key=child_values.get)
+            else:
+                current = min(children, key=child_values.get)
+            path.append(current)
+        return path
+
+    def _check_utility_function(self, utility_function: Optional[Callable[[float], float]]) -> None:
+        if self.prune_dominated and utility_function is not self.utility_function:
+            raise ValueError("Dominated alternatives were pruned for a different utility function,"
+                             " reduce the tree again or with prune_dominated=False")
+
+    def _expand_node_value(self, node_id: str, values: Dict[str, float]) -> float:
+        if node_id in values:
+            return values[node_id]
+        node = self.original_structure.nodes[node_id]
+        children = [(child_id, prob) for child_id, prob in self._original_children[node_id]
+                    if self.node_map[child_id] is not None]
+        if node.node_type == NodeType.CHANCE:
+            value = sum(prob * self._expand_node_value(child_id, values) for child_id, prob in children)
+        else:
+            value = max(self._expand_node_value(child_id, values) for child_id, _ in children)
+        values[node_id] = value
+        return value
+
+class TreeReducer:
+    """Handles reduction of decision trees into smaller equivalent trees"""
+
+    def __init__(self, tree_structure: TreeStructure,
+                 utility_function: Optional[Callable[[float], float]] = None):
+        self.tree_structure = tree_structure
+        self.utility_function = utility_function
+
+    def reduce(self, prune_dominated: bool = True) -> ReducedTree:
+        """
+        Build a smaller tree with the same optimal decisions and root values.
+
+        Consecutive chance nodes are merged by multiplying probabilities, pass-through nodes
+        (a single child reached with certainty) are spliced out and, if prune_dominated is set,
+        decision alternatives whose upper bound is below the best lower bound of a sibling are
+        dropped. Bounds start at the terminal values (in utility units with the reducer's utility
+        function), decision nodes take the best lower and upper bound of their alternatives and
+        chance nodes the probability-weighted sums of their outcomes' bounds. Pruning therefore
+        holds for any utility function as long as decisions maximize it.
+
+        Returns:
+            ReducedTree with the reduced structure and the mapping to the original node IDs
+        """
+        original_children = {node_id: [] for node_id in self.tree_structure.nodes}
+        parent_count = {node_id: 0 for node_id in self.tree_structure.nodes}
+        for edge in self.tree_structure.edges:
+            original_children[edge.from_node].append((edge.to_node, edge.probability))
+            parent_count[edge.to_node] += 1
+        roots = [node_id for node_id, count in parent_count.items() if count == 0]
+
+        children = {node_id: list(node_children) for node_id, node_children in original_children.items()}
+        if prune_dominated:
+            bounds = {}
+            for node_id in self.tree_structure.nodes:
+                self._calculate_bounds(node_id, children, bounds)
+            for node_id, node in self.tree_structure.nodes.items():
+                if node.node_type == NodeType.DECISION and len(children[node_id]) > 1:
+                    best_lower = max(bounds[child_id][0] for child_id, _ in children[node_id])
+                    children[node_id] = [(child_id, prob) for child_id, prob in children[node_id]
+                                         if bounds[child_id][1] >= best_lower]
+
+        node_map = {}
+        for root in roots:
+            self._reduce_node(root, children, parent_count, node_map)
+        for node_id in self.tree_structure.nodes:
+            node_map.setdefault(node_id, None)
+        self._resolve_node_map(node_map)
+
+        reduced = TreeStructure()
+        for node_id, node in self.tree_structure.nodes.items():
+            if node_map[node_id] == node_id:
+                reduced.add_node(Node(node.node_id, node.name, node.node_type, node.value))
+        for node_id in reduced.nodes:
+            for child_id, prob in children[node_id]:
+                reduced.add_edge(Edge(node_id, child_id, prob))
+        return ReducedTree(reduced, self.tree_structure, node_map, prune_dominated,
+                           self.utility_function, original_children)
+
+    def _calculate_bounds(self, node_id: str, children: Dict[str, List[Tuple[str, float]]],
+                          bounds: Dict[str, Tuple[float, float]]) -> Tuple[float, float]:
+        """Get (lower, upper) bounds of a node's value (or utility) from the terminal values below it"""
+        if node_id in bounds:
+            return bounds[node_id]
+        node = self.tree_structure.nodes[node_id]
+        if node.node_type == NodeType.TERMINAL:
+            value = self.utility_function(node.value) if self.utility_function is not None else node.value
+            bounds[node_id] = (value, value)
+        elif not children[node_id]:
+            bounds[node_id] = (0.0, 0.0)
+        else:
+            child_bounds = [(prob, self._calculate_bounds(child_id, children, bounds))
+                            for child_id, prob in children[node_id]]
+            if node.node_type == NodeType.DECISION:
+                lower = max(lower for _, (lower, _) in child_bounds)
+                upper = max(upper for _, (_, upper) in child_bounds)
+            else:
+                # Probabilities need not sum to 1, so the bounds are weighted like the value itself
+                lower = sum(prob * lower for prob, (lower, _) in child_bounds)
+                upper = sum(prob * upper for prob, (_, upper) in child_bounds)
+            bounds[node_id] = (lower, upper)
+        return bounds[node_id]
+
+    def _reduce_node(self, node_id: str, children: Dict[str, List[Tuple[str, float]]],
+                     parent_count: Dict[str, int], node_map: Dict[str, Optional[str]]) -> None:
+        """Reduce the subtree below a node, children first, recording removed nodes in node_map"""
+        if node_id in node_map:
+            return
+        node_map[node_id] = node_id
+        for child_id, _ in children[node_id]:
+            self._reduce_node(child_id, children, parent_count, node_map)
+
+        node = self.tree_structure.nodes[node_id]
+        reduced_children = []
+        pending = list(reversed(children[node_id]))
+        while pending:
+            child_id, prob = pending.pop()
+            child = self.tree_structure.nodes[child_id]
+            grandchildren = children[child_id]
+            if child.node_type == NodeType.TERMINAL or parent_count[child_id] != 1 or not grandchildren:
+                reduced_children.append((child_id, prob))
+            elif len(grandchildren) == 1 and (child.node_type == NodeType.DECISION or grandchildren[0][1] == 1.0):
+                # Pass-through node: the parent connects straight to the only child
+                node_map[child_id] = grandchildren[0][0]
+                pending.append((grandchildren[0][0], prob))
+            elif node.node_type == NodeType.CHANCE and child.node_type == NodeType.CHANCE:
+                # Chance on chance: the parent absorbs the child's outcomes
+                node_map[child_id] = node_id
+                pending.extend((grandchild_id, prob * grandchild_prob)
+                               for grandchild_id, grandchild_prob in reversed(grandchildren))
+            else:
+                reduced_children.append((child_id, prob))
+        children[node_id] = reduced_children
+
+    def _resolve_node_map(self, node_map: Dict[str, Optional[str]]) -> None:
+        """Follow chains of removed nodes until each one points at a kept node"""
+        for node_id in node_map:
+            target = node_map[node_id]
+            while target is not None and node_map[target] != target:
+                target = node_map[target]
+            node_map[node_id] = target
@@ -1,8 +1,13 @@
+import copy
+import io
+import json
 import math
+import subprocess
+import sys
 import numpy as np
 import pytest
-from dtree import DecisionTree
-from dtree.models import NodeType
+from dtree import DecisionTree, ExpectedValueCalculator
+from dtree.models import Node, Edge, NodeType, TreeStructure
 
 def build_tree(utility_function=None):
     dt = DecisionTree(utility_function=utility_function)
@@ -144,4 +149,423 @@ def test_decision_tree_with_expected_utilities():
 
     for node_id, values in expected_util.items():
         assert math.isclose(ev_util[node_id]['expected_value'], values['expected_value'], abs_tol=1e-6), f"{node_id} expected_value mismatch"
-        assert math.isclose(ev_util[node_id]['utility_value'], values['utility_value'], rel_tol=1e-6), f"{node_id} utility_value mismatch" 
\ No newline at end of file
+        assert math.isclose(ev_util[node_id]['utility_value'], values['utility_value'], rel_tol=1e-6), f"{node_id} utility_value mismatch" 
+
+def test_value_of_information():
+    dt = build_tree()
+
+    # --- EVPI for single nodes and sets of nodes ---
+    assert math.isclose(dt.calculate_evpi("D"), 43_400.0, abs_tol=1e-6)
+    assert math.isclose(dt.calculate_evpi("GD"), 6_800.0, abs_tol=1e-6)
+    assert math.isclose(dt.calculate_evpi(["D", "GD"]), 49_400.0, abs_tol=1e-6)
+
+    # --- EVSI: a perfect signal matches EVPI, an uninformative one is worthless ---
+    perfect_signal = {"positive": {"G": 1.0, "NG": 0.0}, "negative": {"G": 0.0, "NG": 1.0}}
+    noise_signal = {"positive": {"G": 0.5, "NG": 0.5}, "negative": {"G": 0.5, "NG": 0.5}}
+    assert math.isclose(dt.calculate_evsi("D", perfect_signal), 43_400.0, abs_tol=1e-6)
+    assert math.isclose(dt.calculate_evsi("D", noise_signal), 0.0, abs_tol=1e-6)
+    with pytest.raises(ValueError):
+        dt.calculate_evsi("D", {"positive": {"G": 0.5, "NG": 1.0}})
+    with pytest.raises(ValueError):
+        dt.calculate_evsi("D", {"positive": {"G": 1.5, "NG": 0.5}, "negative": {"G": -0.5, "NG": 0.5}})
+    with pytest.raises(ValueError):
+        dt.calculate_evpi("G")
+
+    # --- Ranking ---
+    ranking = dt.rank_evpi()
+    assert [node_id for node_id, _ in ranking] == ["D", "GD"]
+    assert math.isclose(ranking[0][1], 43_400.0, abs_tol=1e-6)
+
+    # --- Same results with a utility function, EVPI is then in utility units ---
+    dt_utility = build_tree(lambda x: x / 1000)
+    assert math.isclose(dt_utility.calculate_evpi("D"), 43.4, abs_tol=1e-9)
+
+    # --- Chance nodes without children are worthless to learn about, as in the ranking ---
+    dt_empty = DecisionTree()
+    dt_empty.add_decision_node("R", "Decision")
+    dt_empty.add_chance_node("C", "Empty chance")
+    dt_empty.add_terminal_node("T", "Outcome", 5)
+    dt_empty.add_edge("R", "C")
+    dt_empty.add_edge("R", "T")
+    assert dt_empty.calculate_evpi("C") == 0.0
+    assert dt_empty.calculate_evsi("C", {"positive": {}}) == 0.0
+    assert dt_empty.rank_evpi() == []
+    with pytest.raises(ValueError):
+        dt_empty.calculate_evsi("C", {"positive": {"T": 1.0}})
+
+    # --- The base evaluation is untouched ---
+    assert math.isclose(dt.calculate_expected_values()["I"]["expected_value"], 32_000.0, abs_tol=1e-6)
+
+
+def test_reduce_tree():
+    dt = DecisionTree()
+    dt.add_decision_node("R", "Decision")
+    dt.add_decision_node("X", "Single alternative")
+    dt.add_terminal_node("B", "Safe option", 5)
+    dt.add_decision_node("P", "Dominated alternative")
+    dt.add_terminal_node("T4", "Poor option", 1)
+    dt.add_chance_node("A", "First chance")
+    dt.add_chance_node("A1", "Second chance")
+    dt.add_terminal_node("T1", "Outcome 1", 10)
+    dt.add_terminal_node("T2", "Outcome 2", 20)
+    dt.add_terminal_node("T3", "Outcome 3", 0)
+    dt.add_edge("R", "X")
+    dt.add_edge("R", "B")
+    dt.add_edge("R", "P")
+    dt.add_edge("P", "T4")
+    dt.add_edge("X", "A")
+    dt.add_edge("A", "A1", 0.5)
+    dt.add_edge("A", "T1", 0.5)
+    dt.add_edge("A1", "T2", 0.5)
+    dt.add_edge("A1", "T3", 0.5)
+
+    reduced = dt.reduce_tree()
+
+    # --- Structure: pass-through and chance-on-chance nodes are gone, dominated alternatives pruned ---
+    assert set(reduced.tree_structure.nodes) == {"R", "A", "T1", "T2", "T3"}
+    assert set(reduced.tree_structure.get_children("A")) == {("T1", 0.5), ("T2", 0.25), ("T3", 0.25)}
+    assert reduced.node_map["X"] == "A"
+    assert reduced.node_map["A1"] == "A"
+    assert all(reduced.node_map[node_id] is None for node_id in ["B", "P", "T4"])
+
+
+    # --- Results use the reduced IDs unless expanded, the optimal path uses the original IDs ---
+    original = dt.calculate_raw_expected_values()
+    values = reduced.calculate_expected_values()
+    assert set(values) == set(reduced.tree_structure.nodes)
+    expanded = reduced.calculate_expected_values(expand=True)
+    assert set(expanded) == set(original) - {"B", "P", "T4"}
+    for node_id, value in expanded.items():
+        assert math.isclose(value, original[node_id], abs_tol=1e-6)
+    assert reduced.get_optimal_path("R") == dt.get_optimal_path("R") == ["R", "X", "A", "A1", "T2"]
+
+    # --- Pruning only holds for maximizing the utility the tree was reduced with ---
+    with pytest.raises(ValueError):
+        reduced.get_optimal_path("R", maximize=False)
+    with pytest.raises(ValueError):
+        reduced.calculate_expected_values(lambda x: -x)
+    unpruned = dt.reduce_tree(prune_dominated=False)
+    assert unpruned.get_optimal_path("R", maximize=False) == dt.get_optimal_path("R", maximize=False)
+    util_values = unpruned.calculate_expected_values(lambda x: np.cbrt(x).item())
+    assert math.isclose(util_values["R"], ExpectedValueCalculator(dt.tree_structure).calculate_expected_utilities(
+        lambda x: np.cbrt(x).item())["R"], rel_tol=1e-9)
+
+
+def test_reduce_tree_bounds():
+    # --- Probabilities below 1 are weighted into the bounds ---
+    dt = DecisionTree()
+    dt.add_decision_node("R", "Decision")
+    dt.add_chance_node("C", "Partial chance")
+    dt.add_terminal_node("A", "Outcome", 100)
+    dt.add_terminal_node("B", "Safe option", 60)
+    dt.add_edge("R", "C")
+    dt.add_edge("C", "A", 0.5)
+    dt.add_edge("R", "B")
+    reduced = dt.reduce_tree()
+    assert math.isclose(reduced.calculate_expected_values()["R"], 60.0, abs_tol=1e-9)
+    assert reduced.get_optimal_path("R") == ["R", "B"]
+
+    # --- Bounds use the tree's utility function, even a decreasing one ---
+    dt = DecisionTree(utility_function=lambda x: -x)
+    dt.add_decision_node("R", "Decision")
+    dt.add_terminal_node("A", "Small cost", 1)
+    dt.add_terminal_node("B", "Large cost", 5)
+    dt.add_edge("R", "A")
+    dt.add_edge("R", "B")
+    reduced = dt.reduce_tree()
+    assert math.isclose(reduced.calculate_expected_values(dt.utility_function)["R"], -1.0, abs_tol=1e-9)
+    assert reduced.get_optimal_path("R", utility_function=dt.utility_function) == ["R", "A"]
+
+
+def test_rooted_evaluation(capsys):
+    dt = build_tree()
+    # Add the root last so it is not the first node in insertion order
+    dt.add_decision_node("Z", "Start")
+    dt.add_terminal_node("W", "Walk away", 0)
+    dt.add_edge("Z", "I")
+    dt.add_edge("Z", "W")
+    assert dt.get_roots() == ["Z"]
+
+    # --- Edges appended to the edges list directly are still indexed ---
+    structure = TreeStructure()
+    structure.add_node(Node("a", "A", NodeType.DECISION))
+    structure.add_node(Node("b", "B", NodeType.TERMINAL, 1.0))
+    structure.edges.append(Edge("a", "b"))
+    assert structure.get_children("a") == [("b", 1.0)]
+    assert structure.get_roots() == ["a"]
+    snapshot = structure.fork()
+    ExpectedValueCalculator(snapshot).calculate_expected_values()
+    structure.add_node(Node("c", "C", NodeType.TERMINAL, 2.0))
+    structure.edges.append(Edge("a", "c"))
+    assert ExpectedValueCalculator(structure).calculate_expected_values()["a"] == 2.0
+
+    # --- Only the subtree below the start node is evaluated ---
+    sub_values = dt.calculate_raw_expected_values("G")
+    assert set(sub_values) == {"G", "GD", "GS", "NM", "GM"}
+    assert math.isclose(sub_values["G"], 200_000.0, abs_tol=1e-6)
+    assert dt.get_optimal_path("G") == ["G", "GD", "GM"]
+
+    # --- Diagrams start from the real root, or from an explicit one ---
+    diagram = dt.generate_mermaid_diagram()
+    assert "Z ==> I" in diagram
+    sub_diagram = dt.generate_mermaid_diagram(root="G")
+    assert "I ==>" not in sub_diagram and "G ==> GD" in sub_diagram
+    assert "linkStyle 0 stroke:#e15759" in sub_diagram
+
+    # --- Summaries start from the given node ---
+    dt.print_tree_summary(root="G")
+    summary = capsys.readouterr().out
+    assert "DECISION: Gas found (G)" in summary
+    assert "TERMINAL: Good market conditions (GM)" in summary
+    assert "(I)" not in summary and "(Z)" not in summary
+
+
+def test_write_tree_summary():
+    dt = build_tree()
+
+    # --- Returned as a string, or written to any stream ---
+    summary = dt.write_tree_summary()
+    assert summary.startswith("Decision Tree Summary:")
+    assert "TERMINAL: Good market conditions (GM)" in summary
+    stream = io.StringIO()
+    assert dt.write_tree_summary(stream) is None
+    assert stream.getvalue() == summary
+
+    # --- Depth, node budget and optimal path filters ---
+    shallow = dt.write_tree_summary(max_depth=1)
+    assert "(D)" in shallow and "DECISION: Gas found (G)" not in shallow
+    assert dt.write_tree_summary(max_nodes=2).count("  Expected Value:") == 2
+    optimal = dt.write_tree_summary(optimal_path_only=True)
+    assert "TERMINAL: Sell land (S)" not in optimal and "TERMINAL: Good market conditions (GM)" in optimal
+
+    # --- JSON Lines ---
+    records = [json.loads(line) for line in dt.write_tree_summary(json_lines=True).splitlines()]
+    assert len(records) == len(dt.tree_structure.nodes)
+    assert records[0]["node_id"] == "I" and records[0]["depth"] == 0
+    assert math.isclose(records[0]["expected_value"], 32_000.0, abs_tol=1e-6)
+    gm = next(record for record in records if record["node_id"] == "GM")
+    assert gm["depth"] == 4 and gm["children"] == []
+
+
+def test_columnar_export_and_import():
+    dt = build_tree()
+
+    # --- Node and edge columns ---
+    nodes = dt.export_nodes()
+    assert list(nodes["node_id"]) == list(dt.tree_structure.nodes)
+    index = {node_id: i for i, node_id in enumerate(nodes["node_id"])}
+    assert nodes["expected_value"][index["I"]] == 32_000.0
+    assert np.isnan(nodes["value"][index["D"]])
+    assert nodes["depth"][index["GM"]] == 4 and nodes["parent"][index["GM"]] == "GD"
+    assert nodes["parent"][index["I"]] == ""
+    assert set(nodes["node_id"][nodes["on_optimal_path"]]) == {"I", "D", "G", "GD", "GM"}
+    edges = dt.export_edges()
+    assert len(edges["probability"]) == len(dt.tree_structure.edges)
+    records = dt.export_node_records()
+    assert records.node_id[0] == "I" and records.expected_value[0] == 32_000.0
+
+    # --- Round trips ---
+    rebuilt = DecisionTree.from_columns(records, edges)
+    assert rebuilt.calculate_raw_expected_values() == dt.calculate_raw_expected_values()
+    nodes_csv, edges_csv = io.StringIO(), io.StringIO()
+    dt.write_csv(nodes_csv, edges_csv)
+    nodes_csv.seek(0)
+    edges_csv.seek(0)
+    rebuilt = DecisionTree.from_csv(nodes_csv, edges_csv)
+    assert rebuilt.get_optimal_path("I") == dt.get_optimal_path("I")
+    assert rebuilt.get_children("D") == dt.get_children("D")
+
+
+def test_lazy_imports():
+    code = (
+        "import sys, dtree\n"
+        "dtree.DecisionTree().calculate_expected_values()\n"
+        "print(any(m in sys.modules for m in ('dtree.formatters', 'dtree.columnar', 'mermaid', 'numpy')))"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "False"
+
+
+def test_replace_components(tmp_path, monkeypatch):
+    import dtree.core
+    from dtree.formatters import PrecisionFormatter, TreePrinter
+    dt = build_tree()
+
+    # --- Components can still be replaced after the lazy creation ---
+    dt.formatter = PrecisionFormatter(2)
+    dt.printer = TreePrinter(dt.tree_structure, dt.formatter)
+    assert dt.printer.formatter is dt.formatter
+
+    # --- Mermaid can be patched on the module ---
+    saved = []
+
+    class FakeMermaid:
+        def __init__(self, code):
+            self.code = code
+
+        def to_png(self, filename):
+            saved.append((filename, self.code))
+
+    monkeypatch.setattr(dtree.core, "Mermaid", FakeMermaid)
+    dt.save_mermaid_graph(str(tmp_path / "tree.png"))
+    assert saved and saved[0][1].startswith("graph")
+    monkeypatch.setattr(dtree.core, "Mermaid", None)
+    with pytest.raises(ImportError):
+        dt.save_mermaid_graph(str(tmp_path / "tree.png"))
+
+
+def test_cli(tmp_path, capsys):
+    from dtree.cli import main
+    dt = build_tree()
+    data = {
+        "nodes": [
+            {"node_id": node.node_id, "name": node.name, "node_type": node.node_type.value, "value": node.value}
+            for node in dt.tree_structure.nodes.values()
+        ],
+        "edges": [
+            {"from_node": edge.from_node, "to_node": edge.to_node, "probability": edge.probability}
+            for edge in dt.tree_structure.edges
+        ],
+    }
+    tree_file = tmp_path / "tree.json"
+    tree_file.write_text(json.dumps(data))
+
+    # --- Batch mode: one JSON line per file, failures reported without stopping ---
+    assert main([str(tree_file), str(tmp_path / "missing.json"), str(tree_file)]) == 1
+    captured = capsys.readouterr()
+    lines = [json.loads(line) for line in captured.out.splitlines()]
+    assert len(lines) == 2
+    assert math.isclose(lines[0]["expected_values"]["I"], 32_000.0, abs_tol=1e-6)
+    assert "missing.json" in captured.err
+
+    # --- Malformed files are reported per file ---
+    array_file = tmp_path / "array.json"
+    array_file.write_text("[]")
+    string_file = tmp_path / "string.json"
+    data["nodes"][1]["value"] = "22000"
+    string_file.write_text(json.dumps(data))
+    bad_value_file = tmp_path / "bad_value.json"
+    data["nodes"][1]["value"] = [1]
+    bad_value_file.write_text(json.dumps(data))
+    assert main(["-o", "summary", str(array_file), str(bad_value_file), str(string_file)]) == 1
+    captured = capsys.readouterr()
+    assert "array.json" in captured.err and "bad_value.json" in captured.err
+    assert "Traceback" not in captured.err
+    assert "TERMINAL: Sell land (S)" in captured.out
+    assert main(["-o", "values", str(string_file)]) == 0
+    assert json.loads(capsys.readouterr().out)["expected_values"]["S"] == 22_000.0
+
+    assert main(["-o", "path", str(tree_file)]) == 0
+    assert json.loads(capsys.readouterr().out)["optimal_paths"] == {"I": ["I", "D", "G", "GD", "GM"]}
+
+    assert main(["-o", "summary", "--optimal-path-only", str(tree_file)]) == 0
+    assert "TERMINAL: Sell land (S)" not in capsys.readouterr().out
+
+
+def test_fork():
+    dt = build_tree()
+    base_values = dt.calculate_raw_expected_values()
+
+    # --- A fork shares everything until it is changed ---
+    what_if = dt.fork()
+    assert what_if.tree_structure.nodes["GS"] is dt.tree_structure.nodes["GS"]
+    what_if.set_terminal_value("GS", 250_000)
+    what_if.set_probability("D", "G", 0.5)
+    what_if.set_probability("D", "NG", 0.5)
+    assert what_if.tree_structure.nodes["NM"] is dt.tree_structure.nodes["NM"]
+    assert what_if.tree_structure.nodes["GS"] is not dt.tree_structure.nodes["GS"]
+
+    # --- Changes only affect the fork ---
+    fork_values = what_if.calculate_raw_expected_values()
+    assert math.isclose(fork_values["G"], 250_000.0, abs_tol=1e-6)
+    assert math.isclose(fork_values["I"], 105_000.0, abs_tol=1e-6)
+    assert dt.calculate_raw_expected_values() == base_values
+    assert dt.get_children("D") == [("G", 0.3), ("NG", 0.7)]
+    assert what_if.get_children("D") == [("G", 0.5), ("NG", 0.5)]
+    assert [edge.probability for edge in what_if.tree_structure.edges][2:4] == [0.5, 0.5]
+    assert [edge.probability for edge in dt.tree_structure.edges][2:4] == [0.3, 0.7]
+
+    # --- Changing the base after forking does not leak into forks, and forks of forks work ---
+    dt.set_terminal_value("NG", 0)
+    assert math.isclose(dt.calculate_raw_expected_values()["I"], 60_000.0, abs_tol=1e-6)
+    assert what_if.calculate_raw_expected_values() == fork_values
+    nested = what_if.fork()
+    nested.add_terminal_node("X", "Extra option", 500_000)
+    nested.add_edge("I", "X")
+    assert nested.get_optimal_path("I") == ["I", "X"]
+    assert "X" not in what_if.tree_structure.nodes
+    assert what_if.get_optimal_path("I") == ["I", "D", "G", "GS"]
+
+    # --- Utility values are cached per utility function ---
+    util_fork = build_tree(utility_function=lambda x: np.cbrt(x).item()).fork()
+    util_values = util_fork.calculate_expected_values()
+    util_fork.set_terminal_value("S", 0)
+    assert util_fork.calculate_expected_values()["S"]["utility_value"] == 0.0
+    assert util_fork.calculate_expected_values()["GM"] == util_values["GM"]
+
+
+def test_fork_reuses_cached_results(monkeypatch):
+    dt = build_tree()
+    what_if = dt.fork()
+    dt.calculate_raw_expected_values()
+
+    evaluated = []
+    original_evaluate_node = ExpectedValueCalculator._evaluate_node
+
+    def counting_evaluate_node(self, node_id, values, *args):
+        if node_id not in values:
+            evaluated.append(node_id)
+        return original_evaluate_node(self, node_id, values, *args)
+
+    monkeypatch.setattr(ExpectedValueCalculator, "_evaluate_node", counting_evaluate_node)
+
+    # --- Only the changed terminal and its ancestors are evaluated again ---
+    what_if.set_terminal_value("NM", 10_000)
+    values = what_if.calculate_raw_expected_values()
+    assert sorted(evaluated) == sorted(["NM", "GD", "G", "D", "I"])
+    assert math.isclose(values["GD"], 160_000.0, abs_tol=1e-6)
+    assert list(values) == list(dt.tree_structure.nodes)
+    evaluated.clear()
+    assert what_if.calculate_raw_expected_values() == values
+    assert evaluated == []
+    monkeypatch.undo()
+
+    # --- The base tree is left alone: plain edges list, equal to an identical tree ---
+    assert type(dt.tree_structure.edges) is list
+    assert dt.tree_structure == build_tree().tree_structure
+    what_if.set_terminal_value("NM", 110_000)
+    assert what_if.tree_structure == build_tree().tree_structure
+
+    # --- Nodes added after a cached evaluation are evaluated too ---
+    what_if.add_terminal_node("Q", "Quit", 1_000_000)
+    what_if.add_edge("I", "Q")
+    values = what_if.calculate_raw_expected_values()
+    assert list(values) == list(what_if.tree_structure.nodes)
+    assert math.isclose(values["I"], 1_000_000.0, abs_tol=1e-6)
+    dt.add_terminal_node("Q", "Quit", 1)
+    assert dt.calculate_raw_expected_values()["Q"] == 1
+
+
+def test_fork_layers_stay_shallow():
+    dt = build_tree()
+    base = dt
+    forks = []
+    for i in range(50):
+        forks.append(base.fork())
+        base.set_terminal_value("GS", 160_000 + i)
+    nested = dt.fork()
+    for i in range(50):
+        nested = nested.fork()
+        nested.set_terminal_value("NM", 110_000 + i)
+    for tree in [base, nested, forks[0]]:
+        nodes = tree.tree_structure.nodes
+        assert not hasattr(nodes, "maps") or len(nodes.maps) <= 2
+    assert math.isclose(base.calculate_raw_expected_values()["GS"], 160_049.0, abs_tol=1e-6)
+    assert math.isclose(forks[0].calculate_raw_expected_values()["GS"], 160_000.0, abs_tol=1e-6)
+    assert math.isclose(nested.calculate_raw_expected_values()["NM"], 110_049.0, abs_tol=1e-6)
+
+    # --- Deep copies of forks can still be changed ---
+    copied = copy.deepcopy(forks[10])
+    copied.set_probability("D", "G", 0.5)
+    assert copied.get_children("D")[0] == ("G", 0.5)
+    assert forks[10].get_children("D")[0] == ("G", 0.3)